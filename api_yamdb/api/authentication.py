@@ -0,0 +1,110 @@
+"""Аутентификация по JWT без чтения пользователя на каждый запрос.
+
+Токен, выданный TokenViewSet, содержит имя, роль и признак
+суперпользователя. По ним собирается несохраняемый экземпляр User, с
+которым работают разрешения и внешние ключи. Актуальность роли и
+активность пользователя проверяются по копии из БД, которая хранится в
+памяти процесса AUTH_STATE_TTL секунд и сбрасывается при сохранении
+пользователя в этом процессе. Если утверждения токена разошлись с БД,
+токен отклоняется и нужно получить новый. Токены без этих утверждений
+проверяются как раньше, чтением пользователя из БД.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import User
+
+CLAIMS = ('username', 'role', 'is_superuser')
+
+
+def access_token_for(user):
+    token = AccessToken.for_user(user)
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class UserStates:
+    """Значения CLAIMS и активность пользователя по его id.
+
+    Записи упорядочены по сроку годности: обновлённая запись переносится
+    в конец. Устаревшие записи удаляются из начала при каждом чтении из
+    БД, поэтому в памяти остаются только пользователи, обращавшиеся за
+    последние AUTH_STATE_TTL секунд. Изменения словаря защищены
+    блокировкой для многопоточных серверов; запрос к БД выполняется
+    без неё.
+    """
+
+    def __init__(self):
+        self.states = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        cached = self.states.get(user_id)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        state = User.objects.filter(pk=user_id).values(
+            *CLAIMS, 'is_active'
+        ).first()
+        with self.lock:
+            self.prune(now)
+            self.states[user_id] = (now + settings.AUTH_STATE_TTL, state)
+            self.states.move_to_end(user_id)
+        return state
+
+    def prune(self, now):
+        while self.states:
+            user_id, (expires, _) = next(iter(self.states.items()))
+            if expires > now:
+                return
+            del self.states[user_id]
+
+    def forget(self, user_id):
+        with self.lock:
+            self.states.pop(user_id, None)
+
+
+user_states = UserStates()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_state(sender, instance, **kwargs):
+    user_states.forget(instance.pk)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        state = user_states.get(user_id)
+        if state is None:
+            raise AuthenticationFailed(
+                'User not found', code='user_not_found'
+            )
+        if not state['is_active']:
+            raise AuthenticationFailed(
+                'User is inactive', code='user_inactive'
+            )
+        if any(state[claim] != validated_token[claim] for claim in CLAIMS):
+            raise AuthenticationFailed(
+                'User has changed, request a new token',
+                code='token_outdated'
+            )
+        # Экземпляр не содержит остальных полей и не должен сохраняться:
+        # для изменения профиля пользователь читается из БД.
+        user = User(pk=user_id, **state)
+        user._state.adding = False
+        return user
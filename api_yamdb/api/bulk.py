@@ -0,0 +1,136 @@
+"""Пакетное создание отзывов и комментариев.
+
+Пакет проверяется целиком несколькими запросами на множествах id и
+сохраняется одним bulk_create в одной транзакции: либо создаются все
+элементы, либо возвращаются ошибки по каждому элементу в порядке
+запроса.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import REVIEW_EXISTS, unique_violation
+from reviews import generations
+from reviews.models import Comment, Review, Title
+
+
+class ReviewItemSerializer(serializers.ModelSerializer):
+    title = serializers.IntegerField(source='title_id')
+
+    class Meta:
+        model = Review
+        fields = ('title', 'text', 'score')
+
+
+class CommentItemSerializer(serializers.ModelSerializer):
+    review = serializers.IntegerField(source='review_id')
+
+    class Meta:
+        model = Comment
+        fields = ('review', 'text')
+
+
+def validate_items(data, item_serializer):
+    """Проверяет поля элементов без обращений к БД."""
+    if not isinstance(data, list) or not data:
+        raise ValidationError(
+            {'non_field_errors': ['Ожидается непустой список объектов']}
+        )
+    if len(data) > settings.BULK_MAX_ITEMS:
+        raise ValidationError({'non_field_errors': [
+            f'Не больше {settings.BULK_MAX_ITEMS} объектов в одном запросе'
+        ]})
+    serializer = item_serializer(data=data, many=True)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def raise_item_errors(errors):
+    if any(errors):
+        raise ValidationError(errors)
+
+
+def saved_with_ids(model, objects, **filters):
+    """Объекты после bulk_create с id.
+
+    Если СУБД не возвращает id вставленных строк, они перечитываются:
+    в транзакции последние строки автора по этим родителям - только что
+    вставленные.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_ids_from_bulk_insert:
+        return objects
+    ids = model.objects.filter(**filters).order_by(
+        '-id'
+    ).values_list('id', flat=True)[:len(objects)]
+    for obj, pk in zip(objects, reversed(list(ids))):
+        obj.pk = pk
+    return objects
+
+
+def create_reviews(data, author):
+    items = validate_items(data, ReviewItemSerializer)
+    title_ids = {item['title_id'] for item in items}
+    titles = Title.objects.only('id', 'name').in_bulk(title_ids)
+    reviewed = set(Review.objects.filter(
+        author=author, title_id__in=title_ids
+    ).values_list('title_id', flat=True))
+    errors = []
+    for item in items:
+        if item['title_id'] not in titles:
+            errors.append({'title': ['Произведение не найдено']})
+        elif item['title_id'] in reviewed:
+            errors.append({'non_field_errors': [REVIEW_EXISTS]})
+        else:
+            errors.append({})
+        reviewed.add(item['title_id'])
+    raise_item_errors(errors)
+
+    reviews = [
+        Review(author=author, title=titles[item['title_id']],
+               text=item['text'], score=item['score'])
+        for item in items
+    ]
+    scores = defaultdict(list)
+    for review in reviews:
+        scores[review.title_id].append(review.score)
+    with transaction.atomic():
+        # Проверка выше не защищает от параллельной записи тех же отзывов.
+        with unique_violation(REVIEW_EXISTS):
+            Review.objects.bulk_create(reviews)
+        for title_id, title_scores in scores.items():
+            titles[title_id].change_scores(
+                len(title_scores), sum(title_scores)
+            )
+        generations.bump(generations.REVIEWS)
+        reviews = saved_with_ids(
+            Review, reviews, author=author, title_id__in=title_ids
+        )
+    return reviews
+
+
+def create_comments(data, author):
+    items = validate_items(data, CommentItemSerializer)
+    review_ids = {item['review_id'] for item in items}
+    reviews = Review.objects.only('id', 'text').in_bulk(review_ids)
+    raise_item_errors([
+        {} if item['review_id'] in reviews
+        else {'review': ['Отзыв не найден']}
+        for item in items
+    ])
+
+    comments = [
+        Comment(author=author, review=reviews[item['review_id']],
+                text=item['text'])
+        for item in items
+    ]
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        generations.bump(generations.COMMENTS)
+        comments = saved_with_ids(
+            Comment, comments, author=author, review_id__in=review_ids
+        )
+    return comments
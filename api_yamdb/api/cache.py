@@ -0,0 +1,78 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from reviews.generations import get_generations
+from api.conditional import ConditionalGetMixin, conditional_response
+
+
+def response_cache_key(request, resources):
+    """Ключ ответа: адрес, отсортированные параметры и поколения ресурсов.
+
+    Схема и хост входят в ключ, потому что ссылки пагинации в ответе
+    абсолютные.
+    """
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    ))
+    source = '|'.join([
+        request.build_absolute_uri(request.path), query,
+        *get_generations(resources)
+    ])
+    return f'response:{md5(source.encode()).hexdigest()}'
+
+
+class CachedResponseMixin(ConditionalGetMixin):
+    """Кэширует ответы на анонимные GET-запросы.
+
+    cache_resources - ресурсы reviews.generations, из данных которых
+    собирается ответ; запись в любой из них делает ответ недоступным.
+    Кэшируются данные ответа и его валидаторы, поэтому попадание в кэш,
+    в том числе с ответом 304, не обращается к БД; отрисовка
+    выполняется заново. Действия подключаются миксинами CachedListMixin
+    и CachedRetrieveMixin.
+    """
+    cache_resources = ()
+    cached_headers = ('ETag', 'Last-Modified')
+
+    def cached(self, handler, request, *args, **kwargs):
+        timeout = settings.RESPONSE_CACHE_TIMEOUT
+        if not timeout or request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        # Поколения читаются до запроса к БД: если запись завершится,
+        # пока строится ответ, он сохранится под устаревшим ключом.
+        key = response_cache_key(request, self.cache_resources)
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            if 'ETag' in headers:
+                response = conditional_response(request, headers)
+                if response is not None:
+                    return response
+            return Response(data, headers=headers)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {
+                name: response[name]
+                for name in self.cached_headers if response.has_header(name)
+            }
+            cache.set(key, (response.data, headers), timeout)
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    def list(self, request, *args, **kwargs):
+        return self.cached(self.conditional_list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(
+            self.conditional_retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,87 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+
+def conditional_response(request, headers):
+    """Ответ 304 или 412, если условия запроса выполняются, иначе None."""
+    last_modified = headers.get('Last-Modified')
+    response = get_conditional_response(
+        request,
+        etag=headers['ETag'],
+        last_modified=last_modified and parse_http_date_safe(last_modified)
+    )
+    if response is not None:
+        for name, value in headers.items():
+            response[name] = value
+    return response
+
+
+class ConditionalGetMixin:
+    """Отвечает на If-None-Match и If-Modified-Since до сериализации.
+
+    Валидаторы строятся по уже загруженным строкам ответа: их id и полю
+    modified, а для списка ещё по количеству строк и ссылкам пагинации,
+    поэтому не требуют дополнительных запросов. Изменения связанных
+    объектов, попадающих в ответ, переносятся в modified сигналами из
+    reviews.signals. Данные ответа, которые не хранятся в строках,
+    добавляет к ETag validator_state. Last-Modified отдаётся только для
+    одного объекта: удаление строки из списка не меняет наибольший
+    modified.
+    """
+
+    def validator_state(self):
+        """Состояние ответа помимо его строк, по умолчанию пустое."""
+        return []
+
+    def conditional_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        state = [(row.pk, row.modified.isoformat()) for row in rows]
+        if page is not None:
+            state.append(self.pagination_state())
+        state.append(self.validator_state())
+        headers = {'ETag': self.etag(state)}
+        response = conditional_response(request, headers)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(rows, many=True)
+        if page is None:
+            response = Response(serializer.data)
+        else:
+            response = self.get_paginated_response(serializer.data)
+        response['ETag'] = headers['ETag']
+        return response
+
+    def conditional_retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        headers = {
+            'ETag': self.etag([
+                instance.pk, instance.modified.isoformat(),
+                self.validator_state()
+            ]),
+            'Last-Modified': http_date(instance.modified.timestamp()),
+        }
+        response = conditional_response(request, headers)
+        if response is not None:
+            return response
+        response = Response(self.get_serializer(instance).data)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def pagination_state(self):
+        paginator = self.paginator
+        page = getattr(paginator, 'page', None)
+        return [
+            page and page.paginator.count,
+            paginator.get_next_link(),
+            paginator.get_previous_link(),
+        ]
+
+    @staticmethod
+    def etag(state):
+        return f'W/"{md5(repr(state).encode()).hexdigest()}"'
@@ -0,0 +1,68 @@
+from rest_framework.exceptions import ValidationError
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """Выборочные поля ответа: ?fields=id,name или ?omit=description.
+
+    Выбранные поля передаются сериалайзеру (SparseFieldsMixin) в
+    контексте, а из БД читаются только нужные им столбцы. sparse_columns
+    сопоставляет полю сериалайзера пути для only(), поле без записи
+    читает одноимённый столбец. sparse_always - столбцы, нужные при
+    любом выборе: ключи пагинации, modified для ETag и внешний ключ на
+    родителя, по которому связанный менеджер подставляет родителя без
+    запроса. sparse_related - пути select_related для полей, без этих
+    полей JOIN не выполняется.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_columns = {}
+    sparse_always = ('id', 'modified')
+    sparse_related = {}
+
+    def get_sparse_fields(self):
+        """Выбранные поля или None, если ответ содержит все поля."""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not (
+            'fields' in params or 'omit' in params
+        ):
+            return None
+        available = list(self.get_serializer_class()(context={}).fields)
+        fields = split_names(params.get('fields', '')) or set(available)
+        omit = split_names(params.get('omit', ''))
+        unknown = (fields | omit).difference(available)
+        if unknown:
+            raise ValidationError({
+                'fields': [f'Неизвестные поля: {", ".join(sorted(unknown))}']
+            })
+        return [name for name in available if name in fields - omit]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        columns = set(self.sparse_always)
+        for name in fields:
+            columns.update(self.sparse_columns.get(name, (name,)))
+        related = [
+            self.sparse_related[name]
+            for name in fields if name in self.sparse_related
+        ]
+        if queryset.query.select_related:
+            queryset = queryset.select_related(None)
+            if related:
+                queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fields'] = self.get_sparse_fields()
+        return context
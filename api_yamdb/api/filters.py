@@ -1,21 +1,42 @@
 import django_filters
-from reviews.models import Title
+from reviews.dictionaries import slug_ids
+from reviews.models import Category, Genre, Title
+from reviews.search import get_backend
+
+
+class SlugInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Список слагов через запятую."""
 
 
 class FilterForTitles(django_filters.FilterSet):
-    name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
-    category = django_filters.CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    genre = django_filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
+    """Фильтры по подстроке обслуживает поисковый бэкенд reviews.search.
+
+    category_slug и genre_slug сравнивают слаги целиком: слаги переводятся
+    в id по кэшу справочников, и фильтр идёт по индексированным внешним
+    ключам.
+    """
+    name = django_filters.CharFilter(method='filter_search')
+    category = django_filters.CharFilter(method='filter_search')
+    genre = django_filters.CharFilter(method='filter_search')
+    category_slug = SlugInFilter(method='filter_category_slug')
+    genre_slug = SlugInFilter(method='filter_genre_slug')
 
     class Meta:
         model = Title
         fields = ['name', 'year', 'genre', 'category']
+
+    def filter_search(self, queryset, name, value):
+        return get_backend().filter(queryset, name, value)
+
+    def filter_category_slug(self, queryset, name, value):
+        return queryset.filter(category_id__in=slug_ids(Category, value))
+
+    def filter_genre_slug(self, queryset, name, value):
+        # Полусоединение с таблицей связей вместо JOIN не размножает строки
+        # произведений и не требует DISTINCT; подзапрос идёт по индексу
+        # genre_id, поэтому редкий жанр не заставляет просматривать все
+        # произведения, как коррелированный EXISTS.
+        links = Title.genre.through.objects.filter(
+            genre_id__in=slug_ids(Genre, value)
+        )
+        return queryset.filter(id__in=links.values('title_id'))
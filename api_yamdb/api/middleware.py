@@ -0,0 +1,98 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api.timing')
+_local = threading.local()
+
+
+class RequestTimings:
+    """Счётчики одного запроса, заполняются обёрткой запросов к БД."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.view_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def timed(name):
+    """Добавляет время блока к счётчику name текущего запроса, если он есть."""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(
+            timings, name,
+            getattr(timings, name) + time.perf_counter() - start
+        )
+
+
+class RequestTimingMiddleware:
+    """Время работы с БД, сериализаторов и view каждого запроса.
+
+    Результат отдаётся заголовком Server-Timing и строкой json в логгер
+    api.timing с именем маршрута DRF (titles-list, reviews-detail, ...).
+    Включается настройкой REQUEST_TIMING.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        end = time.perf_counter()
+        total = end - start
+        view = end - timings.view_start if timings.view_start else 0.0
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+            f'serializer;dur={timings.serializer * 1000:.2f}',
+            f'view;dur={view * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'route': match.url_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.db * 1000, 2),
+            'serializer_ms': round(timings.serializer * 1000, 2),
+            'view_ms': round(view * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings.view_start = time.perf_counter()
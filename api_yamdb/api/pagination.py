@@ -0,0 +1,120 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Постраничная выдача с переходом на keyset по запросу клиента.
+
+    По умолчанию работает как PageNumberPagination. Если в запросе есть
+    параметр cursor (пустой для первой страницы), страница выбирается
+    условием по полям view.keyset_ordering вместо OFFSET и без COUNT(*),
+    поэтому стоимость не зависит от глубины страницы. Последнее поле
+    keyset_ordering должно быть уникальным.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.ordering = view.keyset_ordering
+        self.fields = [
+            queryset.model._meta.get_field(name) for name in self.ordering
+        ]
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        ordering = [f'-{name}' if reverse else name for name in self.ordering]
+        page = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+        self.next_position = self.previous_position = None
+        if page and (has_more or reverse):
+            self.next_position = self.position_of(page[-1])
+        if page and (has_more if reverse else position is not None):
+            self.previous_position = self.position_of(page[0])
+        return page
+
+    def after(self, position, reverse):
+        """Строки строго после position в порядке keyset_ordering.
+
+        (a, b) > (x, y) раскрывается в a > x OR (a = x AND b > y), чтобы
+        условие обслуживалось составным индексом на любой СУБД.
+        """
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for equal, value in zip(self.ordering[:index], position):
+                step &= Q(**{equal: value})
+            condition |= step
+        return condition
+
+    def position_of(self, instance):
+        return [
+            field.value_to_string(instance) for field in self.fields
+        ]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')))
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, data['position'])
+            ]
+            reverse = bool(data['reverse'])
+        except (BinasciiError, UnicodeError, ValueError, KeyError,
+                TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = b64encode(json.dumps(
+            {'position': position, 'reverse': reverse}
+        ).encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            cursor
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,40 @@
+from django.shortcuts import get_object_or_404
+
+from reviews.models import Review, Title
+
+
+class ParentObjectMixin:
+    """Родительские объекты вложенных маршрутов.
+
+    Произведение и отзыв из параметров пути читаются один раз за запрос:
+    они хранятся в request.parents и передаются сериалайзеру в контексте
+    под именами из parent_names. Отзыв ищется сразу с условием по
+    title_id, поэтому отзыв другого произведения даёт 404 без отдельного
+    запроса произведения.
+    """
+    parent_names = ()
+
+    def get_parent(self, name, queryset, **lookups):
+        parents = getattr(self.request, 'parents', None)
+        if parents is None:
+            parents = self.request.parents = {}
+        if name not in parents:
+            parents[name] = get_object_or_404(queryset, **lookups)
+        return parents[name]
+
+    def get_title(self):
+        return self.get_parent('title', Title, pk=self.kwargs['title_id'])
+
+    def get_review(self):
+        return self.get_parent(
+            'review',
+            Review,
+            pk=self.kwargs['review_id'],
+            title_id=self.kwargs['title_id'],
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        for name in self.parent_names:
+            context[name] = getattr(self, f'get_{name}')()
+        return context
@@ -24,7 +24,7 @@ class IsAdminModeratorOwnerOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in SAFE_METHODS
-            or obj.author == request.user
+            or obj.author_id == request.user.id
             or request.user.is_admin
             or request.user.is_moderator
             or request.user.is_superuser
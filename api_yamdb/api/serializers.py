@@ -1,13 +1,81 @@
 import datetime as dt
+from collections import OrderedDict
+from contextlib import contextmanager
 
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, models, transaction
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator, ValidationError
 
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.middleware import timed
+from reviews.dictionaries import (attach_dictionaries, get_by_slugs,
+                                  missing_objects)
+from reviews.models import (Category, CategoryStats, Comment, Genre,
+                            GenreStats, Review, Title, User)
+
+TITLE_EXISTS = 'Такой тайтл уже есть'
+REVIEW_EXISTS = 'Отзыв к данному произведению уже добавлен'
+
+
+@contextmanager
+def unique_violation(message):
+    """Превращает нарушение уникальности в ответ 400 с message.
+
+    Вместо проверки exists() перед записью повтор ловит ограничение БД.
+    Запись выполняется в точке сохранения, поэтому транзакция запроса
+    после ошибки остаётся рабочей. Остальные ошибки целостности
+    пробрасываются.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as error:
+        if 'unique' not in str(error).lower():
+            raise
+        raise ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+        ) from error
+
+
+class TimedSerializerMixin:
+    """Учитывает время сериализации ответа в RequestTimingMiddleware.
+
+    Замеряются только объекты верхнего уровня: сам сериалайзер или
+    элементы списка при many=True, вложенные сериалайзеры входят в них.
+    """
+
+    def to_representation(self, instance):
+        parent = self.parent
+        if parent is not None and not (
+            isinstance(parent, serializers.ListSerializer)
+            and parent.parent is None
+        ):
+            return super().to_representation(instance)
+        with timed('serializer'):
+            return super().to_representation(instance)
+
+
+class SparseFieldsMixin:
+    """Оставляет поля, выбранные параметрами fields и omit запроса.
+
+    Выбор делает SparseFieldsetMixin представления и передаёт его в
+    контексте, вложенные сериалайзеры не затрагиваются.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('sparse_fields')
+        if selected is None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in selected
+        )
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         required=True,
         validators=[UniqueValidator(queryset=User.objects.all())]
@@ -23,14 +91,14 @@ class UserSerializer(serializers.ModelSerializer):
                   'last_name', 'bio', 'role')
 
 
-class UserEditSerializer(serializers.ModelSerializer):
+class UserEditSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         fields = '__all__'
         model = User
         read_only_fields = ('role',)
 
 
-class SignupSerializer(serializers.ModelSerializer):
+class SignupSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         validators=[
             UniqueValidator(queryset=User.objects.all())
@@ -57,7 +125,8 @@ class TokenSerializer(serializers.Serializer):
     confirmation_code = serializers.CharField()
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                       serializers.ModelSerializer):
     title = serializers.SlugRelatedField(
         read_only=True,
         slug_field='name'
@@ -70,36 +139,35 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = '__all__'
-
-    def validate(self, data):
-        title = get_object_or_404(
-            Title,
-            pk=self.context['view'].kwargs.get('title_id')
-        )
-        if (self.context['request'].method == 'POST'
-            and Review.objects.filter(title=title,
-                                      author=self.context['request'].user
-                                      ).exists()):
-            raise ValidationError(
-                'Отзыв к данному произведению уже добавлен'
-            )
-        return data
+        exclude = ('modified',)
 
+    @transaction.atomic
     def create(self, validated_data):
-        review = Review.objects.create(**validated_data)
-        validated_data['title'].update_rating()
+        with unique_violation(REVIEW_EXISTS):
+            review = Review.objects.create(**validated_data)
+        validated_data['title'].add_score(review.score)
         return review
 
+    @transaction.atomic
     def update(self, review, validated_data):
-        review.text = validated_data.get('text', review.text)
-        review.score = validated_data.get('score', review.score)
-        review.save()
-        validated_data['title'].update_rating()
+        old_score = review.locked_score()
+        if old_score is None:
+            raise NotFound()
+        update_fields = ['score', 'modified']
+        # Текст отзыва выводится в комментариях, его изменение обновляет
+        # их modified (reviews.signals.touch_review_comments).
+        if validated_data.get('text', review.text) != review.text:
+            review.text = validated_data['text']
+            update_fields.append('text')
+        review.score = validated_data.get('score', old_score)
+        review.save(update_fields=update_fields)
+        if review.score != old_score:
+            validated_data['title'].replace_score(old_score, review.score)
         return review
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                        serializers.ModelSerializer):
     review = serializers.SlugRelatedField(
         read_only=True,
         slug_field='text'
@@ -111,10 +179,10 @@ class CommentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Comment
-        fields = '__all__'
+        exclude = ('modified',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для категорий.
     Параметр пути - слаг."""
     class Meta:
@@ -123,7 +191,7 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для жанров.
     Параметр пути - слаг."""
     class Meta:
@@ -132,39 +200,134 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = 'slug'
 
 
-class TitleSerializer(serializers.ModelSerializer):
-    genre = serializers.SlugRelatedField(
+class CategoryStatsSerializer(TimedSerializerMixin,
+                              serializers.ModelSerializer):
+    name = serializers.CharField(source='category.name')
+    slug = serializers.CharField(source='category.slug')
+    average_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = CategoryStats
+        fields = ('name', 'slug', 'titles_count', 'reviews_count',
+                  'average_score')
+
+
+class GenreStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    name = serializers.CharField(source='genre.name')
+    slug = serializers.CharField(source='genre.slug')
+    average_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = GenreStats
+        fields = ('name', 'slug', 'titles_count', 'reviews_count',
+                  'average_score')
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """Проверяет слаг по кэшу справочников вместо запроса к БД.
+
+    Копия справочника может содержать запись, удалённую другим процессом,
+    поэтому сериалайзер перед записью сверяет найденные объекты с БД
+    через confirm_cached.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        found = get_by_slugs(self.get_queryset().model, [data])
+        if not found:
+            self.fail(
+                'does_not_exist',
+                slug_name=self.slug_field,
+                value=smart_str(data)
+            )
+        return found[0]
+
+
+class TitleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    genre = CachedSlugRelatedField(
         slug_field='slug', many=True, queryset=Genre.objects.all()
     )
-    category = serializers.SlugRelatedField(
+    category = CachedSlugRelatedField(
         slug_field='slug', queryset=Category.objects.all()
     )
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'rating', 'description',
+                  'genre', 'category')
+        read_only_fields = ('rating',)
 
     def validate_year(self, value):
         if value > dt.date.today().year:
             raise ValidationError(f'{value} год еще не настал')
         return value
 
-    def validate(self, data):
-        if Title.objects.filter(
-            name=data.get('name'),
-            year=data.get('year')
-        ).exists():
-            raise ValidationError('Такой тайтл уже есть')
-        return data
+    def validate(self, attrs):
+        self.confirm_cached(attrs, 'category', self.fields['category'])
+        self.confirm_cached(
+            attrs, 'genre', self.fields['genre'].child_relation, many=True
+        )
+        return attrs
+
+    @staticmethod
+    def confirm_cached(attrs, name, field, many=False):
+        """Ошибка does_not_exist для объектов, удалённых из БД."""
+        if not attrs.get(name):
+            return
+        objects = attrs[name] if many else [attrs[name]]
+        missing = missing_objects(field.get_queryset().model, objects)
+        if missing:
+            raise ValidationError({name: [
+                field.error_messages['does_not_exist'].format(
+                    slug_name=field.slug_field, value=obj.slug
+                )
+                for obj in missing
+            ]})
 
+    def create(self, validated_data):
+        with unique_violation(TITLE_EXISTS):
+            return super().create(validated_data)
 
-class SafeTitleSerializer(serializers.ModelSerializer):
-    rating = serializers.IntegerField(
-        source='reviews__score__avg', read_only=True
-    )
-    genre = GenreSerializer(many=True)
-    category = CategorySerializer()
+    def update(self, title, validated_data):
+        with unique_violation(TITLE_EXISTS):
+            return super().update(title, validated_data)
+
+
+class TitleListSerializer(serializers.ListSerializer):
+    """Подставляет справочники всем произведениям списка разом."""
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        titles = list(data)
+        self.child.attach_dictionaries(titles)
+        return super().to_representation(titles)
+
+
+class SafeTitleSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                          serializers.ModelSerializer):
+    """Сериалайзер для чтения произведений.
+    Рейтинг берётся из хранимого поля Title.rating, категория и жанры -
+    из кэша справочников."""
+    genre = GenreSerializer(many=True, source='cached_genres')
+    category = CategorySerializer(source='cached_category')
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'rating', 'description',
+                  'genre', 'category')
+        read_only_fields = ('rating',)
+        list_serializer_class = TitleListSerializer
+
+    def attach_dictionaries(self, titles):
+        attach_dictionaries(
+            titles,
+            category='category' in self.fields,
+            genres='genre' in self.fields
+        )
+
+    def to_representation(self, instance):
+        if not isinstance(self.parent, TitleListSerializer):
+            self.attach_dictionaries([instance])
+        return super().to_representation(instance)
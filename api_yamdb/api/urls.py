@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework import routers
 from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
                        ReviewViewSet, TitleViewSet, UserViewSet, signup,
-                       TokenViewSet)
+                       TokenViewSet, bulk_comments, bulk_reviews)
 
 v1_router = routers.DefaultRouter()
 v1_router.register(r'users', UserViewSet)
@@ -23,5 +23,7 @@ v1_router.register(
 
 urlpatterns = [
     path('auth/signup/', signup, name='signup'),
+    path('reviews/bulk/', bulk_reviews, name='bulk-reviews'),
+    path('comments/bulk/', bulk_comments, name='bulk-comments'),
     path('', include(v1_router.urls)),
 ]
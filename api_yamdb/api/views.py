@@ -1,20 +1,28 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
 
-from reviews.models import Category, Genre, Review, Title, User
+from reviews import generations, outbox
+from reviews.dictionaries import versions
+from reviews.models import Category, Genre, Title, User
+from api import bulk
+from api.authentication import access_token_for
+from api.cache import CachedListMixin, CachedRetrieveMixin
+from api.fieldsets import SparseFieldsetMixin
 from api.filters import FilterForTitles
+from api.pagination import KeysetPagination
+from api.parents import ParentObjectMixin
 from api.permissions import (IsAdmin, IsAdminModeratorOwnerOrReadOnly,
                              IsAdminUserOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
-                             GenreSerializer, SafeTitleSerializer,
+from api.serializers import (CategorySerializer, CategoryStatsSerializer,
+                             CommentSerializer, GenreSerializer,
+                             GenreStatsSerializer, SafeTitleSerializer,
                              ReviewSerializer, SignupSerializer,
                              TitleSerializer, TokenSerializer,
                              UserEditSerializer, UserSerializer)
@@ -37,7 +45,8 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer_class=UserEditSerializer,
     )
     def users_own_profile(self, request):
-        user = request.user
+        # request.user из токена содержит не все поля профиля.
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'GET':
             serializer = self.get_serializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -64,16 +73,31 @@ def signup(request):
         username=serializer.validated_data['username']
     )
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    outbox.send_mail(
         subject='YaMDb registration',
         message=f'Your confirmation code: {confirmation_code}',
-        from_email=None,
-        recipient_list=[user.email],
+        recipient=user.email,
     )
 
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_reviews(request):
+    reviews = bulk.create_reviews(request.data, request.user)
+    serializer = ReviewSerializer(reviews, many=True)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_comments(request):
+    comments = bulk.create_comments(request.data, request.user)
+    serializer = CommentSerializer(comments, many=True)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 class TokenViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = TokenSerializer
@@ -89,60 +113,91 @@ class TokenViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
         if default_token_generator.check_token(
                 user, serializer.validated_data['confirmation_code']
         ):
-            token = AccessToken.for_user(user)
+            token = access_token_for(user)
             return Response({'token': str(token)}, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ParentObjectMixin,
+    SparseFieldsetMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminModeratorOwnerOrReadOnly,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('pub_date', 'id')
+    parent_names = ('title',)
+    sparse_always = ('id', 'modified', 'pub_date', 'title')
+    sparse_columns = {'author': ('author', 'author__username')}
+    sparse_related = {'author': 'author'}
+    cache_resources = (generations.REVIEWS, generations.TITLES)
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        # Отзывы из связанного менеджера получают произведение без запроса.
+        return self.get_title().reviews.select_related('author')
 
     def perform_create(self, serializer):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
-        )
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
     def perform_update(self, serializer):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
-        )
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
+    @transaction.atomic
     def perform_destroy(self, review):
+        score = review.locked_score()
+        if score is None:
+            raise NotFound()
         review.delete()
-        review.title.update_rating()
+        review.title.remove_score(score)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    ParentObjectMixin,
+    SparseFieldsetMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = CommentSerializer
     permission_classes = (IsAdminModeratorOwnerOrReadOnly,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('pub_date', 'id')
+    parent_names = ('review',)
+    sparse_always = ('id', 'modified', 'pub_date', 'review')
+    sparse_columns = {'author': ('author', 'author__username')}
+    sparse_related = {'author': 'author'}
+    cache_resources = (generations.COMMENTS, generations.REVIEWS)
 
     def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            pk=self.kwargs.get('review_id')
-        )
-        return review.comments.all()
+        return self.get_review().comments.select_related('author')
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title=self.kwargs.get('title_id')
+        serializer.save(author=self.request.user, review=self.get_review())
+
+
+class DictionaryStatsMixin:
+    """Действие stats: хранимая статистика произведений справочника."""
+    stats_serializer_class = None
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, slug=None):
+        serializer_class = self.stats_serializer_class
+        stats = get_object_or_404(
+            serializer_class.Meta.model.objects.select_related(
+                self.stats_group
+            ),
+            **{f'{self.stats_group}__slug': slug}
         )
-        serializer.save(author=self.request.user, review=review)
+        return Response(serializer_class(stats).data)
 
 
 class CategoryViewSet(
+    DictionaryStatsMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
@@ -154,9 +209,14 @@ class CategoryViewSet(
     permission_classes = (IsAdminUserOrReadOnly, )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
+    cache_resources = (generations.CATEGORIES,)
+    stats_group = 'category'
+    stats_serializer_class = CategoryStatsSerializer
 
 
 class GenreViewSet(
+    DictionaryStatsMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
@@ -168,16 +228,37 @@ class GenreViewSet(
     permission_classes = (IsAdminUserOrReadOnly, )
     filter_backends = (filters.SearchFilter, )
     search_fields = ('name', )
+    cache_resources = (generations.GENRES,)
+    stats_group = 'genre'
+    stats_serializer_class = GenreStatsSerializer
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(Avg('reviews__score'))
+class TitleViewSet(
+    SparseFieldsetMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
+    viewsets.ModelViewSet
+):
+    # Категории и жанры для чтения подставляет SafeTitleSerializer
+    # из кэша справочников.
+    queryset = Title.objects.order_by('id')
     serializer_class = TitleSerializer
     permission_classes = (IsAdminUserOrReadOnly,)
     filterset_class = FilterForTitles
     filter_backends = (DjangoFilterBackend,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('id',)
+    # Жанры читаются не из строки произведения, а из таблицы связей.
+    sparse_columns = {'genre': ()}
+    cache_resources = (
+        generations.TITLES, generations.CATEGORIES, generations.GENRES
+    )
 
     def get_serializer_class(self):
         if self.action in ('retrieve', 'list'):
             return SafeTitleSerializer
         return TitleSerializer
+
+    def validator_state(self):
+        # Копии справочников обновляются позже строк произведений.
+        return versions(Category, Genre)
@@ -28,7 +28,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -43,7 +43,12 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'reviews.User'
 
+# Сколько секунд процесс доверяет прочитанным роли и активности
+# пользователя при аутентификации по токену с утверждениями о роли.
+AUTH_STATE_TTL = 30
+
 MIDDLEWARE = [
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +58,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Количество запросов и время БД, сериализаторов и view в заголовке
+# Server-Timing и в логгере api.timing.
+REQUEST_TIMING = True
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -79,9 +88,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Тестовая БД в файле, а не в памяти: тестам конкурентной записи
+        # нужны отдельные соединения потоков к одной базе.
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+    }
+}
+
+# Для нескольких процессов нужен общий кэш (memcached, redis), иначе
+# каждый процесс сбрасывает кэш ответов только после своих записей.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
+# Время хранения ответов на анонимные GET-запросы, 0 отключает кэш.
+# Включайте кэш только с общим бэкендом CACHES: с LocMemCache записи
+# других процессов не сбрасывают сохранённые ответы.
+RESPONSE_CACHE_TIMEOUT = 0
+
+# Сколько секунд процесс держит копию категорий и жанров, не сверяясь с
+# БД. Без общего бэкенда CACHES поколения справочников не доходят до
+# других процессов, и их копии обновляются только по истечении срока.
+DICTIONARY_MAX_AGE = 60
+
+# Отзывы только отмечают произведение, рейтинг пересчитывает команда
+# refreshratings раз в DEFERRED_RATINGS_INTERVAL секунд.
+DEFERRED_RATINGS = False
+DEFERRED_RATINGS_INTERVAL = 5
+
+# Наибольшее число отзывов или комментариев в одном пакетном запросе.
+BULK_MAX_ITEMS = 100
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,3 +153,28 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# Письма ставятся в очередь и отправляются командой sendmail.
+EMAIL_OUTBOX = False
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Пауза после первой неудачи в секундах, удваивается с каждой попыткой.
+EMAIL_OUTBOX_BACKOFF = 30
+EMAIL_OUTBOX_MAX_BACKOFF = 3600
+# Время, на которое обработчик забирает пакет писем.
+EMAIL_OUTBOX_LEASE = 300
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -1,9 +1,46 @@
 from django.contrib import admin
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from django.db import transaction
+
+from reviews import ratings
+from reviews.models import (Category, CategoryStats, Comment, DirtyTitle,
+                            Genre, GenreStats, OutgoingEmail, Review, Title,
+                            User)
 
 admin.site.register(User)
 admin.site.register(Category)
 admin.site.register(Genre)
 admin.site.register(Title)
-admin.site.register(Review)
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    """Правка и удаление отзывов в админке минуют Title.change_scores,
+    поэтому рейтинги затронутых произведений пересчитываются."""
+
+    @transaction.atomic
+    def save_model(self, request, review, form, change):
+        super().save_model(request, review, form, change)
+        title_ids = {review.title_id}
+        if 'title' in form.changed_data and form.initial.get('title'):
+            title_ids.add(form.initial['title'])
+        ratings.reconcile(title_ids)
+
+    @transaction.atomic
+    def delete_model(self, request, review):
+        super().delete_model(request, review)
+        ratings.reconcile([review.title_id])
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        title_ids = list(
+            queryset.order_by().values_list('title_id', flat=True).distinct()
+        )
+        super().delete_queryset(request, queryset)
+        ratings.reconcile(title_ids)
+
+
 admin.site.register(Comment)
+admin.site.register(OutgoingEmail)
+admin.site.register(DirtyTitle)
+admin.site.register(CategoryStats)
+admin.site.register(GenreStats)
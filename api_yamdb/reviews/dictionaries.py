@@ -0,0 +1,154 @@
+"""Процессный кэш справочников Category и Genre.
+
+Справочники маленькие и меняются редко, поэтому каждый процесс держит
+их целиком в памяти. Согласованность между процессами обеспечивают
+поколения из reviews.generations: запись в справочник заменяет общее
+поколение в кэше Django, и процесс, заметивший новое поколение,
+перечитывает таблицу. Свой процесс сбрасывает копию сразу, сигналами из
+reviews.signals, не дожидаясь фиксации транзакции. Слаги, которых нет
+в копии (созданные в ещё не зафиксированной транзакции), дочитываются
+из БД по уникальному индексу.
+
+Поколение в локальном кэше (LocMemCache) видно только своему процессу,
+поэтому копия перечитывается и по возрасту: не реже раза в
+DICTIONARY_MAX_AGE секунд при любом поколении. Пока копия устарела,
+отсутствующие в ней id дочитываются из БД, а версия копии (versions)
+входит в валидаторы ответов, собранных из неё. Слаги, проверенные по
+копии, перед записью сверяются с БД (missing_objects).
+"""
+from time import monotonic
+
+from django.conf import settings
+
+from reviews import generations
+from reviews.models import Category, Genre, Title
+
+RESOURCES = {
+    Category: generations.CATEGORIES,
+    Genre: generations.GENRES,
+}
+
+
+class Dictionary:
+    def __init__(self, generation, objects):
+        self.generation = generation
+        self.loaded = monotonic()
+        self.by_id = {obj.pk: obj for obj in objects}
+        self.by_slug = {obj.slug: obj for obj in objects}
+        # Одинакова у копий с одними данными в разных процессах:
+        # изменение записи сдвигает modified, удаление - число записей.
+        newest = max((obj.modified for obj in objects), default=None)
+        self.version = (len(objects), newest and newest.isoformat())
+
+
+_dictionaries = {}
+
+
+def get_dictionaries(*models):
+    """Актуальные копии справочников за одно обращение к кэшу Django."""
+    tokens = generations.get_generations(
+        [RESOURCES[model] for model in models]
+    )
+    loaded_after = monotonic() - settings.DICTIONARY_MAX_AGE
+    result = []
+    for model, token in zip(models, tokens):
+        dictionary = _dictionaries.get(model)
+        if (dictionary is None or dictionary.generation != token
+                or dictionary.loaded < loaded_after):
+            dictionary = Dictionary(token, list(model.objects.all()))
+            _dictionaries[model] = dictionary
+        result.append(dictionary)
+    return result
+
+
+def clear(model):
+    _dictionaries.pop(model, None)
+
+
+def versions(*models):
+    """Версии текущих копий справочников для валидаторов ответов."""
+    return [dictionary.version for dictionary in get_dictionaries(*models)]
+
+
+def missing_objects(model, objects):
+    """Объекты из копии справочника, которых уже нет в БД.
+
+    Запись, удалённая другим процессом, может оставаться в копии до её
+    обновления; в этом случае копия сбрасывается.
+    """
+    existing = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    missing = [obj for obj in objects if obj.pk not in existing]
+    if missing:
+        clear(model)
+    return missing
+
+
+def by_ids(dictionary, model, ids):
+    """Объекты справочника по id; отсутствующие в копии читаются из БД.
+
+    Их нет в копии, если они созданы другим процессом и копия ещё не
+    обновлена или если транзакция создания ещё не видна при её чтении.
+    """
+    found = {pk: dictionary.by_id[pk] for pk in ids if pk in dictionary.by_id}
+    missing = set(ids) - found.keys()
+    if missing:
+        found.update(model.objects.in_bulk(missing))
+    return found
+
+
+def get_by_slugs(model, slugs):
+    """Объекты справочника по слагам, неизвестные слаги пропускаются."""
+    dictionary, = get_dictionaries(model)
+    found = {
+        slug: dictionary.by_slug[slug]
+        for slug in slugs if slug in dictionary.by_slug
+    }
+    missing = set(slugs) - found.keys()
+    if missing:
+        found.update(
+            (obj.slug, obj) for obj in model.objects.filter(slug__in=missing)
+        )
+    return [found[slug] for slug in slugs if slug in found]
+
+
+def slug_ids(model, slugs):
+    return [obj.pk for obj in get_by_slugs(model, slugs)]
+
+
+def attach_dictionaries(titles, category=True, genres=True):
+    """Заполняет cached_category и cached_genres произведений.
+
+    Вместо JOIN с категориями и prefetch жанров читаются только связи
+    произведений с жанрами, сами объекты берутся из копий справочников.
+    Флаги category и genres отключают ненужное ответу: без жанров связи
+    не читаются вовсе.
+    """
+    if not titles:
+        return
+    categories, genre_dictionary = get_dictionaries(Category, Genre)
+    if category:
+        by_id = by_ids(categories, Category, {
+            title.category_id for title in titles
+            if title.category_id is not None
+        })
+        for title in titles:
+            title.cached_category = by_id.get(title.category_id)
+    if not genres:
+        return
+    by_title = {}
+    for title in titles:
+        title.cached_genres = by_title.setdefault(title.pk, [])
+    links = list(Title.genre.through.objects.filter(
+        title_id__in=by_title
+    ).values_list('title_id', 'genre_id'))
+    by_id = by_ids(
+        genre_dictionary, Genre, {genre_id for _, genre_id in links}
+    )
+    for title_id, genre_id in links:
+        # Жанр мог быть удалён после чтения связей.
+        if genre_id in by_id:
+            by_title[title_id].append(by_id[genre_id])
+    for title_genres in by_title.values():
+        title_genres.sort(key=lambda genre: genre.name)
@@ -0,0 +1,45 @@
+"""Поколения ресурсов API для инвалидации кэша ответов.
+
+Поколение - случайная метка в кэше Django, которая заменяется новой при
+каждой записи в данные ресурса. Ключи кэшированных ответов включают
+поколения всех ресурсов, из которых собран ответ, поэтому после записи
+старые ответы просто перестают находиться. Метка заменяется после
+фиксации транзакции: до неё читатели видят в БД старые данные и не
+должны кэшировать их под новым поколением.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY = 'generation:{}'
+TITLES = 'titles'
+CATEGORIES = 'categories'
+GENRES = 'genres'
+REVIEWS = 'reviews'
+COMMENTS = 'comments'
+ALL = (TITLES, CATEGORIES, GENRES, REVIEWS, COMMENTS)
+
+
+def get_generations(resources):
+    """Текущие поколения ресурсов; отсутствующие в кэше создаются."""
+    keys = [CACHE_KEY.format(resource) for resource in resources]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Вытесненную метку нельзя восстанавливать прежним значением:
+            # под ним могли остаться ответы, записанные до её замены.
+            cache.add(key, uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump(*resources):
+    """Заменяет поколения ресурсов после фиксации текущей транзакции."""
+    def replace():
+        cache.set_many(
+            {CACHE_KEY.format(resource): uuid4().hex
+             for resource in resources},
+            None
+        )
+    transaction.on_commit(replace)
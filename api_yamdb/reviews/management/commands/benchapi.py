@@ -0,0 +1,152 @@
+import json
+import math
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from reviews.models import Comment, Review, Title, User
+
+API = '/api/v1'
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def endpoints():
+    """Сценарии чтения на реальных данных: самые нагруженные объекты."""
+    title = Title.objects.order_by('-reviews_count').first()
+    if title is None:
+        raise CommandError('Database is empty, run generatedata --load')
+    review = title.reviews.order_by('-id').first()
+    pages = Title.objects.count() // 10 + 1
+    cases = {
+        'titles-list': f'{API}/titles/',
+        'titles-list (deep page)': f'{API}/titles/?page={pages // 2 + 1}',
+        'titles-list (genre filter)': (
+            f'{API}/titles/?genre={title.genre.values_list("slug")[0][0]}'
+        ),
+        'titles-list (name filter)': f'{API}/titles/?name={title.name[-3:]}',
+        'titles-detail': f'{API}/titles/{title.id}/',
+        'categories-list': f'{API}/categories/',
+        'genres-list': f'{API}/genres/',
+        'reviews-list': f'{API}/titles/{title.id}/reviews/',
+    }
+    if review is not None:
+        reviews = f'{API}/titles/{title.id}/reviews'
+        cases['reviews-list (deep page)'] = (
+            f'{reviews}/?page={title.reviews_count // 20 + 1}'
+        )
+        cases['reviews-detail'] = f'{reviews}/{review.id}/'
+        cases['comments-list'] = f'{reviews}/{review.id}/comments/'
+    return cases
+
+
+class Command(BaseCommand):
+    help = ('Measures latency percentiles and query counts of the API '
+            'read endpoints through the Django test client')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Measured requests per endpoint'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Unmeasured requests per endpoint'
+        )
+        parser.add_argument(
+            '--cache',
+            action='store_true',
+            help='Keep the anonymous response cache enabled'
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the json report, printed to stdout by default'
+        )
+
+    def handle(self, *args, **options):
+        if options['cache']:
+            if not settings.RESPONSE_CACHE_TIMEOUT:
+                raise CommandError(
+                    'Response cache is disabled, set RESPONSE_CACHE_TIMEOUT'
+                )
+            results = self.measure_all(options)
+        else:
+            # Иначе после прогрева измерялось бы только чтение из кэша.
+            with override_settings(RESPONSE_CACHE_TIMEOUT=0):
+                results = self.measure_all(options)
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cache': options['cache'],
+            'rows': {
+                model._meta.model_name: model.objects.count()
+                for model in (User, Title, Review, Comment)
+            },
+            'requests': options['requests'],
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+            self.stdout.write(
+                self.style.SUCCESS(f'Report saved to {options["output"]}')
+            )
+        else:
+            self.stdout.write(output)
+
+    def measure_all(self, options):
+        client = Client()
+        results = {}
+        for name, url in endpoints().items():
+            results[name] = self.measure(
+                client, url, options['requests'], options['warmup']
+            )
+            self.stdout.write(
+                f'{name:<28} p50 {results[name]["p50_ms"]:8.2f} ms  '
+                f'p95 {results[name]["p95_ms"]:8.2f} ms  '
+                f'p99 {results[name]["p99_ms"]:8.2f} ms  '
+                f'{results[name]["queries"]:3} queries'
+            )
+        return results
+
+    def measure(self, client, url, requests, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return {
+            'url': url,
+            'queries': len(queries),
+            'bytes': len(response.content),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+        }
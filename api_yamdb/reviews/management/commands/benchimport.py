@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+
+from reviews import generations
+from reviews.management.commands.importcsv import PARSE_CASES
+from reviews.management.dataset import write_dataset
+from reviews.models import (CategoryStats, DirtyTitle, GenreStats, Title,
+                            User)
+from reviews.search import get_backend
+
+# Таблицы, которые заполняет importcsv.
+IMPORTED_MODELS = [model for model, _, _ in PARSE_CASES] + [
+    CategoryStats, GenreStats, DirtyTitle
+]
+
+
+def truncate():
+    """Очищает таблицы импорта и сбрасывает счётчики их ключей.
+
+    Импорт замеряется без внешней транзакции, чтобы пакеты фиксировались,
+    как при настоящей загрузке, поэтому данные удаляются после замера.
+    """
+    tables = [model._meta.db_table for model in IMPORTED_MODELS]
+    sequences = [
+        sequence for sequence in connection.introspection.sequence_list()
+        if sequence['table'] in tables
+    ]
+    connection.ops.execute_sql_flush(
+        connection.alias,
+        connection.ops.sql_flush(
+            no_style(), tables, sequences, allow_cascade=True
+        )
+    )
+    get_backend().rebuild()
+    generations.bump(*generations.ALL)
+
+
+class Command(BaseCommand):
+    help = ('Compares importcsv through the ORM with the --fast path '
+            'on a generated dataset. Needs an empty database, '
+            'imported tables are truncated after every run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=5000)
+        parser.add_argument('--reviews-per-title', type=int, default=20)
+        parser.add_argument('--comments-per-review', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if User.objects.exists() or Title.objects.exists():
+            raise CommandError('Run the benchmark on an empty database')
+        with tempfile.TemporaryDirectory() as data_dir:
+            counts = write_dataset(
+                data_dir,
+                users=options['users'],
+                categories=10,
+                genres=30,
+                titles=options['titles'],
+                reviews=options['titles'] * options['reviews_per_title'],
+                comments_per_review=options['comments_per_review'],
+            )
+            rows = sum(counts.values())
+            self.stdout.write(f'Generated {rows} rows: {counts}')
+            timings = {}
+            for path, fast in (('orm', False), ('fast', True)):
+                timings[path] = self.measure(
+                    data_dir, fast, options['batch_size']
+                )
+                self.stdout.write(
+                    f'{path:>5}: {timings[path]:.2f}s, '
+                    f'{rows / timings[path]:.0f} rows/s'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Fast path speedup: {timings["orm"] / timings["fast"]:.1f}x'
+        ))
+
+    def measure(self, data_dir, fast, batch_size):
+        start = time.perf_counter()
+        try:
+            call_command(
+                'importcsv',
+                data_dir=data_dir,
+                checkpoint=os.path.join(data_dir, 'checkpoint.json'),
+                batch_size=batch_size,
+                fast=fast,
+                stdout=StringIO()
+            )
+            return time.perf_counter() - start
+        finally:
+            truncate()
@@ -0,0 +1,73 @@
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.management.dataset import write_dataset
+
+
+class Command(BaseCommand):
+    help = ('Generates a synthetic dump in importcsv format with '
+            'Zipf-distributed reviews per title and optionally loads it')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--titles', type=int, default=50000)
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=1000000,
+            help='Total number of reviews, at most titles * users'
+        )
+        parser.add_argument(
+            '--comments-per-review',
+            type=int,
+            default=2,
+            help='Mean number of comments on a review'
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of reviews per title, 0 for uniform'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--out',
+            help='Directory for csv files, a temporary one by default'
+        )
+        parser.add_argument(
+            '--load',
+            action='store_true',
+            help='Import the dump with importcsv --fast'
+        )
+
+    def handle(self, *args, **options):
+        if not options['out'] and not options['load']:
+            raise CommandError('Pass --out, --load or both')
+        if options['out']:
+            self.generate(options['out'], options)
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                self.generate(data_dir, options)
+
+    def generate(self, data_dir, options):
+        counts = write_dataset(
+            data_dir,
+            users=options['users'],
+            categories=options['categories'],
+            genres=options['genres'],
+            titles=options['titles'],
+            reviews=options['reviews'],
+            comments_per_review=options['comments_per_review'],
+            skew=options['skew'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Generated {counts}'))
+        if options['load']:
+            call_command(
+                'importcsv', data_dir=data_dir, fast=True,
+                stdout=self.stdout
+            )
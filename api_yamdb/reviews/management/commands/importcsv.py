@@ -1,150 +1,399 @@
 import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from queue import Empty
 
+import django
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.utils import timezone
+from reviews import generations, stats
 from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.search import get_backend
 
 from api_yamdb.settings import STATICFILES_DIRS
 
 DATA_DIR = f'{STATICFILES_DIRS[0]}/data/'
+CHECKPOINT_FILE = '.importcsv_checkpoint.json'
+BATCH_SIZE = 1000
 
 
-def parse_users(path):
-    """id,username,email,role,bio,first_name,last_name"""
-    users = []
-    with open(path) as file:
-        next(file)
+def read_rows(path, skip=0):
+    """Лениво читает строки csv-файла без заголовка, пропуская skip строк."""
+    with open(path, encoding='utf-8', newline='') as file:
         reader = csv.reader(file)
-        for row in reader:
-            users.append(User(
-                pk=row[0],
-                username=row[1],
-                email=row[2],
-                role=row[3],
-                bio=row[4],
-                first_name=row[5],
-                last_name=row[6]
-            ))
-    User.objects.bulk_create(users)
-
-
-def parse_categories(path):
-    """id,name,slug"""
-    categories = []
-    with open(path) as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            categories.append(Category(
-                pk=row[0],
-                name=row[1],
-                slug=row[2],
-            ))
-    Category.objects.bulk_create(categories)
-
-
-def parse_genres(path):
-    """id,name,slug"""
-    genres = []
-    with open(path) as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            genres.append(Genre(
-                pk=row[0],
-                name=row[1],
-                slug=row[2],
-            ))
-    Genre.objects.bulk_create(genres)
-
-
-def parse_titles(path):
-    """id,name,year,category"""
-    titles = []
-    with open(path, encoding="utf-8") as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            titles.append(Title(
-                pk=row[0],
-                name=row[1],
-                year=row[2],
-                category=Category.objects.get(pk=row[3])
-            ))
-    Title.objects.bulk_create(titles)
-
-
-def set_genre_title_relations(path):
-    """id(unused),title_id,genre_id"""
-    with open(path) as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            Title.objects.get(pk=row[1]).genre.add(
-                Genre.objects.get(pk=row[2])
+        next(reader)
+        yield from islice(reader, skip, None)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# Колонки csv-файлов в терминах атрибутов моделей, None - неиспользуемая
+# колонка. Порядок соответствует графу DEPENDENCIES.
+PARSE_CASES = [
+    [User, 'users', ('id', 'username', 'email', 'role', 'bio',
+                     'first_name', 'last_name')],
+    [Category, 'category', ('id', 'name', 'slug')],
+    [Genre, 'genre', ('id', 'name', 'slug')],
+    [Title, 'titles', ('id', 'name', 'year', 'category_id')],
+    [Title.genre.through, 'genre_title', (None, 'title_id', 'genre_id')],
+    [Review, 'review', ('id', 'title_id', 'text', 'author_id', 'score',
+                        'pub_date')],
+    [Comment, 'comments', ('id', 'review_id', 'text', 'author_id',
+                           'pub_date')],
+]
+MODELS = {file: (model, columns) for model, file, columns in PARSE_CASES}
+
+# Файлы, которые должны быть загружены раньше: на их строки ссылаются
+# внешние ключи.
+DEPENDENCIES = {
+    'users': (),
+    'category': (),
+    'genre': (),
+    'titles': ('category',),
+    'genre_title': ('titles', 'genre'),
+    'review': ('titles', 'users'),
+    'comments': ('review', 'users'),
+}
+
+
+@contextmanager
+def csv_dates(model, columns):
+    """Отключает auto_now_add у полей, значения которых есть в файле.
+
+    Иначе bulk_create заменил бы даты публикации из csv временем загрузки.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in columns and getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def load(file, path, batch_size, skip=0, on_batch=None):
+    """Загружает файл пакетами по batch_size строк, фиксируя каждый пакет.
+
+    При продолжении прерванного импорта (skip > 0) конфликты игнорируются:
+    пакет, сохранённый перед сбоем, но не попавший в контрольную точку,
+    не приведёт к ошибке уникальности.
+    """
+    model, columns = MODELS[file]
+
+    def parse(row):
+        return model(**{
+            name: value for name, value in zip(columns, row) if name
+        })
+
+    done = skip
+    with csv_dates(model, columns):
+        for batch in batched(map(parse, read_rows(path, skip)), batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=skip > 0)
+            done += len(batch)
+            if on_batch is not None:
+                on_batch(done)
+    return done
+
+
+def load_fast(file, path, batch_size, skip=0, on_batch=None):
+    """Загрузка в обход ORM: без создания экземпляров моделей.
+
+    Значения приводятся к формату БД полями модели, недостающие колонки
+    заполняются значениями по умолчанию, поля auto_now - временем начала
+    загрузки. В PostgreSQL пакеты передаются через COPY FROM STDIN,
+    в остальных СУБД - одним executemany.
+    Первый пакет продолженного импорта вставляется с игнорированием
+    конфликтов, как и в load.
+    """
+    model, columns = MODELS[file]
+    connection = connections[router.db_for_write(model)]
+    fields = [
+        field for field in model._meta.concrete_fields
+        if field.attname in columns or not field.primary_key
+    ]
+    indexes = [
+        columns.index(field.attname) if field.attname in columns else None
+        for field in fields
+    ]
+    now = timezone.now()
+    defaults = [
+        now if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False) else field.get_default()
+        for field in fields
+    ]
+
+    def prepare(row):
+        return tuple(
+            field.get_db_prep_save(
+                default if index is None else row[index], connection
             )
+            for field, index, default in zip(fields, indexes, defaults)
+        )
 
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields
+    )
+    done = skip
+    for batch in batched(map(prepare, read_rows(path, skip)), batch_size):
+        ignore_conflicts = skip > 0 and done == skip
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql' and not ignore_conflicts:
+                    copy_rows(cursor, table, names, batch)
+                else:
+                    insert_rows(
+                        connection, cursor, table, names, batch,
+                        ignore_conflicts
+                    )
+        done += len(batch)
+        if on_batch is not None:
+            on_batch(done)
+    return done
 
-def parse_reviews(path):
-    """id,title_id,text,author,score,pub_date"""
-    reviews = []
-    titles = set()
-    with open(path, encoding="utf-8") as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            title = Title.objects.get(pk=row[1])
-            reviews.append(Review(
-                pk=row[0],
-                title=title,
-                text=row[2],
-                author=User.objects.get(pk=row[3]),
-                score=row[4],
-                pub_date=row[5]
-            ))
-            titles.add(title)
-    Review.objects.bulk_create(reviews)
-    for title in titles:
-        title.update_rating()
-
-
-def parse_comments(path):
-    """id,review_id,text,author,pub_date"""
-    comments = []
-    with open(path, encoding="utf-8") as file:
-        next(file)
-        reader = csv.reader(file)
-        for row in reader:
-            comments.append(Comment(
-                pk=row[0],
-                review=Review.objects.get(pk=row[1]),
-                text=row[2],
-                author=User.objects.get(pk=row[3]),
-                pub_date=row[4]
-            ))
-    Comment.objects.bulk_create(comments)
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+def copy_value(value):
+    """Значение в текстовом формате COPY.
+
+    В формате csv пустое значение в кавычках - пустая строка, а не NULL,
+    поэтому используется текстовый формат: NULL записывается как \\N,
+    разделители и обратная косая черта экранируются.
+    """
+    if value is None:
+        return '\\N'
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_buffer(rows):
+    return io.StringIO(''.join(
+        '\t'.join(map(copy_value, row)) + '\n' for row in rows
+    ))
+
+
+def copy_rows(cursor, table, names, rows):
+    cursor.copy_expert(
+        f'COPY {table} ({names}) FROM STDIN', copy_buffer(rows)
+    )
+
+
+def insert_rows(connection, cursor, table, names, rows, ignore_conflicts):
+    placeholders = ', '.join(['%s'] * len(rows[0]))
+    cursor.executemany(
+        f'{connection.ops.insert_statement(ignore_conflicts)} {table} '
+        f'({names}) VALUES ({placeholders}) '
+        f'{connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts)}',
+        rows
+    )
+
+
+def reset_sequences():
+    """Сдвигает счётчики первичных ключей после вставки строк с явными id."""
+    connection = connections[router.db_for_write(Title)]
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, _, _ in PARSE_CASES]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def load_in_worker(file, path, batch_size, skip, progress, fast=False):
+    """Загрузка одного файла в процессе пула.
+
+    Прогресс отправляется в очередь родителю, который один пишет
+    контрольную точку и вывод команды.
+    """
+    return (load_fast if fast else load)(
+        file, path, batch_size, skip,
+        on_batch=lambda rows: progress.put((file, rows))
+    )
+
+
+class Checkpoint:
+    """Количество загруженных строк каждого файла, хранится в json-файле."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.rows = {}
+        if resume and os.path.exists(path):
+            with open(path) as file:
+                self.rows = json.load(file)
+
+    def get(self, file):
+        return self.rows.get(file, 0)
+
+    def save(self, file, rows):
+        self.rows[file] = rows
+        with open(f'{self.path}.tmp', 'w') as tmp:
+            json.dump(self.rows, tmp)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class Command(BaseCommand):
     help = 'Parses csv files to fill a base'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=DATA_DIR,
+            help='Directory with csv files'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of rows inserted and committed at once'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Continue an interrupted import from its checkpoint'
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Number of files loaded in parallel processes, '
+                 'each with its own database connection; SQLite '
+                 'serializes writers, so only other databases gain speed'
+        )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Insert rows with COPY (PostgreSQL) or executemany '
+                 'without building model instances'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help=f'Checkpoint file, {CHECKPOINT_FILE} in data dir by default'
+        )
+
     def handle(self, *args, **options):
-        parse_cases = [
-            [parse_users, 'users'],
-            [parse_categories, 'category'],
-            [parse_genres, 'genre'],
-            [parse_titles, 'titles'],
-            [set_genre_title_relations, 'genre_title'],
-            [parse_reviews, 'review'],
-            [parse_comments, 'comments'],
-        ]
+        data_dir = options['data_dir']
+        self.batch_size = options['batch_size']
+        self.fast = options['fast']
+        self.checkpoint = Checkpoint(
+            options['checkpoint'] or os.path.join(data_dir, CHECKPOINT_FILE),
+            resume=options['resume']
+        )
+        paths = {
+            file: os.path.join(data_dir, f'{file}.csv')
+            for _, file, _ in PARSE_CASES
+        }
+        if options['jobs'] > 1:
+            self.load_parallel(paths, options['jobs'])
+        else:
+            self.load_serial(paths)
+        reset_sequences()
+        Title.objects.update_ratings()
+        # bulk_create и COPY не вызывают сигналы, синхронизирующие поиск
+        # и статистику.
+        get_backend().rebuild()
+        stats.rebuild()
+        generations.bump(*generations.ALL)
+        self.checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS('Successfully updated ratings'))
+
+    def report_batch(self, file, rows):
+        self.checkpoint.save(file, rows)
+        self.stdout.write(f'{file}: {rows} rows')
+
+    def report_file(self, file):
+        self.stdout.write(self.style.SUCCESS(f'Successfully parsed {file}'))
+
+    def load_serial(self, paths):
         errors = []
-        for func, file in parse_cases:
+        for _, file, _ in PARSE_CASES:
             try:
-                func(f'{DATA_DIR}{file}.csv')
-                self.stdout.write(
-                    self.style.SUCCESS(f'Successfully parsed {file}')
+                (load_fast if self.fast else load)(
+                    file,
+                    paths[file],
+                    self.batch_size,
+                    skip=self.checkpoint.get(file),
+                    on_batch=lambda rows, file=file: self.report_batch(
+                        file, rows
+                    )
                 )
+                self.report_file(file)
             except Exception as error:
                 errors.append((file, error))
             if errors:
                 raise CommandError(f'Cannot parse {errors}')
+
+    def load_parallel(self, paths, jobs):
+        """Загружает независимые файлы одновременно по графу DEPENDENCIES.
+
+        Файл ставится в очередь пула, как только загружены все файлы,
+        от которых он зависит. После первой ошибки новые файлы не
+        запускаются, уже начатые дожидаются завершения.
+        """
+        # Дочерние процессы открывают собственные соединения с БД.
+        connections.close_all()
+        manager = multiprocessing.Manager()
+        progress = manager.Queue()
+        waiting = [file for _, file, _ in PARSE_CASES]
+        loaded = set()
+        running = {}
+        errors = []
+        with ProcessPoolExecutor(jobs, initializer=django.setup) as pool:
+            while running or (waiting and not errors):
+                for file in list(waiting):
+                    if errors or not loaded.issuperset(DEPENDENCIES[file]):
+                        continue
+                    waiting.remove(file)
+                    future = pool.submit(
+                        load_in_worker, file, paths[file], self.batch_size,
+                        self.checkpoint.get(file), progress, self.fast
+                    )
+                    running[future] = file
+                done, _ = wait(running, timeout=1, return_when=FIRST_COMPLETED)
+                self.drain_progress(progress)
+                for future in done:
+                    file = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as error:
+                        errors.append((file, error))
+                    else:
+                        loaded.add(file)
+                        self.report_file(file)
+        self.drain_progress(progress)
+        manager.shutdown()
+        if errors:
+            raise CommandError(f'Cannot parse {errors}')
+
+    def drain_progress(self, progress):
+        while True:
+            try:
+                file, rows = progress.get_nowait()
+            except Empty:
+                return
+            self.report_batch(file, rows)
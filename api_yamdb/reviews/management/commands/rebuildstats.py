@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes per-category and per-genre statistics'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = stats.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {rebuilt} stats rows')
+        )
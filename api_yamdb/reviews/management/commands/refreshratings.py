@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reviews import ratings
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Recomputes ratings of titles marked by deferred review writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of titles recomputed in one transaction'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.DEFERRED_RATINGS_INTERVAL,
+            help='Seconds to wait after each pass'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Print the number of marked titles as json and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(json.dumps(ratings.backlog()))
+            return
+        while True:
+            refreshed = ratings.drain(options['batch_size'])
+            if refreshed:
+                self.stdout.write(f'Refreshed {refreshed} ratings')
+            if options['once']:
+                return
+            time.sleep(options['interval'])
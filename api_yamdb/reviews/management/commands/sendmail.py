@@ -0,0 +1,65 @@
+import json
+import time
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+
+from reviews import outbox
+
+BATCH_SIZE = 100
+INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of emails claimed at once'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=INTERVAL,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when no emails are due instead of waiting'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Print the queue depth as json and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(json.dumps(outbox.queue_depth()))
+            return
+        # Открытое заранее соединение бэкенд не закрывает после отправки
+        # и использует для всех пакетов.
+        connection = mail.get_connection()
+        connection.open()
+        try:
+            self.drain(connection, options)
+        finally:
+            connection.close()
+
+    def drain(self, connection, options):
+        while True:
+            emails = outbox.claim(options['batch_size'])
+            if emails:
+                sent = outbox.deliver(emails, connection)
+                self.stdout.write(
+                    f'Sent {sent} of {len(emails)} emails, '
+                    f'queue {json.dumps(outbox.queue_depth())}'
+                )
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from reviews import stats
+from reviews.models import Title
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = ('Reconciles stored title ratings and category and genre '
+            'statistics with reviews')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Number of title ids updated in one transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = Title.objects.aggregate(Max('id'))['id__max'] or 0
+        updated = 0
+        for start in range(0, last_id, batch_size):
+            titles = Title.objects.filter(
+                id__gt=start, id__lte=start + batch_size
+            )
+            with transaction.atomic():
+                updated += titles.update_ratings()
+                stats.refresh_titles(titles.values('id'))
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully synced {updated} ratings')
+        )
@@ -0,0 +1,123 @@
+"""Генерация синтетического дампа в формате csv-файлов importcsv."""
+import csv
+import os
+import random
+
+FILES = {
+    'users': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+              'last_name'),
+    'category': ('id', 'name', 'slug'),
+    'genre': ('id', 'name', 'slug'),
+    'titles': ('id', 'name', 'year', 'category'),
+    'genre_title': ('id', 'title_id', 'genre_id'),
+    'review': ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+    'comments': ('id', 'review_id', 'text', 'author', 'pub_date'),
+}
+TEXT = 'Синтетический текст для нагрузочного тестирования. ' * 3
+
+
+def pub_date(rng):
+    return (f'20{rng.randint(10, 22)}-{rng.randint(1, 12):02}-'
+            f'{rng.randint(1, 28):02}T{rng.randint(0, 23):02}:'
+            f'{rng.randint(0, 59):02}:{rng.randint(0, 59):02}.000Z')
+
+
+def review_counts(rng, titles, reviews, users, skew):
+    """Число отзывов на каждое произведение по закону Ципфа.
+
+    Произведение ранга r получает долю отзывов, пропорциональную 1 / r**skew,
+    но не больше числа пользователей; skew=0 - равномерное распределение.
+    Дробные доли округляются по наибольшим остаткам, а отзывы сверх числа
+    пользователей делятся между остальными произведениями в тех же
+    пропорциях, поэтому в сумме получается reviews (но не больше
+    titles * users). Популярность перемешивается, чтобы не совпадать с
+    порядком id.
+    """
+    weights = [1 / rank ** skew for rank in range(1, titles + 1)]
+    counts = [0] * titles
+    remaining = min(reviews, titles * users)
+    while remaining:
+        open_titles = [
+            index for index in range(titles) if counts[index] < users
+        ]
+        total = sum(weights[index] for index in open_titles)
+        shares = {
+            index: remaining * weights[index] / total
+            for index in open_titles
+        }
+        added = {index: int(share) for index, share in shares.items()}
+        rest = remaining - sum(added.values())
+        for index in sorted(
+            shares, key=lambda index: added[index] - shares[index]
+        )[:rest]:
+            added[index] += 1
+        for index, count in added.items():
+            placed = min(count, users - counts[index])
+            counts[index] += placed
+            remaining -= placed
+    rng.shuffle(counts)
+    return counts
+
+
+def comment_count(rng, comments_per_review, skew):
+    if not skew or not comments_per_review:
+        return comments_per_review
+    return int(rng.expovariate(1 / comments_per_review))
+
+
+def generate_rows(rng, users, categories, genres, titles, reviews,
+                  comments_per_review, skew):
+    """Строки дампа без id в виде пар (файл, строка) в порядке загрузки."""
+    for user in range(1, users + 1):
+        yield 'users', (f'user{user}', f'user{user}@yamdb.fake',
+                        'user', '', '', '')
+    for category in range(1, categories + 1):
+        yield 'category', (f'Категория {category}', f'category{category}')
+    for genre in range(1, genres + 1):
+        yield 'genre', (f'Жанр {genre}', f'genre{genre}')
+    review = 0
+    counts = review_counts(rng, titles, reviews, users, skew)
+    for title, count in enumerate(counts, start=1):
+        yield 'titles', (f'Произведение {title}', rng.randint(1900, 2022),
+                         rng.randint(1, categories))
+        for genre in rng.sample(range(1, genres + 1), min(genres, 2)):
+            yield 'genre_title', (title, genre)
+        for author in rng.sample(range(1, users + 1), count):
+            review += 1
+            yield 'review', (title, TEXT, author, rng.randint(1, 10),
+                             pub_date(rng))
+            for _ in range(comment_count(rng, comments_per_review, skew)):
+                yield 'comments', (review, TEXT, rng.randint(1, users),
+                                   pub_date(rng))
+
+
+def write_dataset(directory, users, categories, genres, titles, reviews,
+                  comments_per_review, skew=0, seed=0):
+    """Пишет csv-файлы и возвращает количество строк в каждом из них.
+
+    reviews - общее число отзывов, распределяемое между произведениями
+    с перекосом skew; comments_per_review - среднее число комментариев.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        name: open(
+            os.path.join(directory, f'{name}.csv'), 'w',
+            encoding='utf-8', newline=''
+        )
+        for name in FILES
+    }
+    counts = dict.fromkeys(FILES, 0)
+    try:
+        writers = {name: csv.writer(file) for name, file in files.items()}
+        for name, header in FILES.items():
+            writers[name].writerow(header)
+        for name, row in generate_rows(
+            random.Random(seed), users, categories, genres, titles,
+            reviews, comments_per_review, skew
+        ):
+            counts[name] += 1
+            writers[name].writerow((counts[name], *row))
+    finally:
+        for file in files.values():
+            file.close()
+    return counts
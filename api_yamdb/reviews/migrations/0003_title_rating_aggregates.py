@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:37
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, NullIf
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    # Хранимый рейтинг отдаётся API напрямую, поэтому он пересчитывается
+    # вместе с агрегатами так же, как reviews.models.rating_expression:
+    # целая часть средней оценки, NULL без отзывов.
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    per_title = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    count = Coalesce(Subquery(
+        per_title.annotate(count=Count('id')).values('count'),
+        output_field=IntegerField()
+    ), 0)
+    total = Coalesce(Subquery(
+        per_title.annotate(total=Sum('score')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+    Title.objects.update(
+        reviews_count=count,
+        scores_sum=total,
+        rating=total / NullIf(count, 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_auto_20221201_0515'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='scores_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
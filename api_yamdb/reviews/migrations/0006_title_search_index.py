@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:52
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SEARCH_TABLE = 'reviews_title_search'
+FILL_SEARCH_TABLE = f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, name, category, genres)
+    SELECT title.id, title.name, COALESCE(category.slug, ''),
+           COALESCE((
+               SELECT GROUP_CONCAT(genre.slug, ' ')
+               FROM reviews_title_genre AS link
+               JOIN reviews_genre AS genre ON genre.id = link.genre_id
+               WHERE link.title_id = title.id
+           ), '')
+    FROM reviews_title AS title
+    LEFT JOIN reviews_category AS category
+        ON category.id = title.category_id
+'''
+POSTGRES_INDEXES = (
+    ('title_name_trgm_idx', 'reviews_title', 'name'),
+    ('category_slug_trgm_idx', 'reviews_category', 'slug'),
+    ('genre_slug_trgm_idx', 'reviews_genre', 'slug'),
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # Выражение совпадает с тем, во что Django превращает icontains.
+        for name, table, column in POSTGRES_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX {name} ON {table} '
+                f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING '
+                f"fts5(name, category, genres, tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite без FTS5 или старше 3.34: поиск работает через LIKE.
+            return
+        schema_editor.execute(FILL_SEARCH_TABLE)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for name, _, _ in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
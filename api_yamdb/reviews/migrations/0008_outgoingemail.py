@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_modified_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='тема')),
+                ('body', models.TextField(verbose_name='текст')),
+                ('from_email', models.CharField(blank=True, max_length=254, null=True, verbose_name='отправитель')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='получатель')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='дата постановки в очередь')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='неудачные попытки')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время следующей попытки')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'исходящее письмо',
+                'verbose_name_plural': 'исходящие письма',
+                'ordering': ['next_attempt', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['attempts', 'next_attempt'], name='outgoing_email_due_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyTitle',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='reviews.Title', verbose_name='произведение')),
+                ('marked', models.DateTimeField(auto_now_add=True, verbose_name='время отметки')),
+            ],
+            options={
+                'verbose_name': 'произведение к пересчёту рейтинга',
+                'verbose_name_plural': 'произведения к пересчёту рейтинга',
+                'ordering': ['marked'],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:16
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def fill_dictionary_stats(apps, schema_editor):
+    for model_name, stats_name, group in (
+        ('Category', 'CategoryStats', 'category'),
+        ('Genre', 'GenreStats', 'genre'),
+    ):
+        Group = apps.get_model('reviews', model_name)
+        Stats = apps.get_model('reviews', stats_name)
+        groups = Group.objects.order_by().annotate(
+            titles_total=Count('titles'),
+            reviews_total=Sum('titles__reviews_count'),
+            scores_total=Sum('titles__scores_sum'),
+        )
+        Stats.objects.bulk_create([
+            Stats(**{
+                f'{group}_id': item.pk,
+                'titles_count': item.titles_total,
+                'reviews_count': item.reviews_total or 0,
+                'scores_sum': item.scores_total or 0,
+            })
+            for item in groups
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_dirtytitle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('titles_count', models.PositiveIntegerField(default=0, verbose_name='количество произведений')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='количество отзывов')),
+                ('scores_sum', models.PositiveIntegerField(default=0, verbose_name='сумма оценок')),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Category', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'статистика категории',
+                'verbose_name_plural': 'статистика категорий',
+            },
+        ),
+        migrations.CreateModel(
+            name='GenreStats',
+            fields=[
+                ('titles_count', models.PositiveIntegerField(default=0, verbose_name='количество произведений')),
+                ('reviews_count', models.PositiveIntegerField(default=0, verbose_name='количество отзывов')),
+                ('scores_sum', models.PositiveIntegerField(default=0, verbose_name='сумма оценок')),
+                ('genre', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Genre', verbose_name='жанр')),
+            ],
+            options={
+                'verbose_name': 'статистика жанра',
+                'verbose_name_plural': 'статистика жанров',
+            },
+        ),
+        migrations.RunPython(fill_dictionary_stats, migrations.RunPython.noop),
+    ]
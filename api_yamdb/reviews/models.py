@@ -1,8 +1,13 @@
-from statistics import mean
-
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Count, F, IntegerField, OuterRef, Subquery,
+                              Sum)
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from reviews import generations
 
 
 class User(AbstractUser):
@@ -44,6 +49,10 @@ class Category(models.Model):
         max_length=50,
         verbose_name='идентификатор'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения'
+    )
 
     class Meta:
         verbose_name = 'категория'
@@ -67,6 +76,10 @@ class Genre(models.Model):
         max_length=50,
         verbose_name='идентификатор'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения'
+    )
 
     class Meta:
         verbose_name = 'жанр'
@@ -77,6 +90,41 @@ class Genre(models.Model):
         return self.name
 
 
+def rating_expression(count, total):
+    """Средняя оценка с отброшенной дробной частью.
+
+    Так API отдавал рейтинг до хранимых агрегатов: IntegerField от
+    Avg('reviews__score'). Целочисленное деление даёт одинаковый
+    результат на всех СУБД, при отсутствии отзывов выражение
+    возвращает NULL.
+    """
+    return total / NullIf(count, 0)
+
+
+class TitleQuerySet(models.QuerySet):
+    def update_ratings(self):
+        """Пересчитывает агрегаты рейтинга выборки одним UPDATE."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        count = Coalesce(Subquery(
+            reviews.annotate(count=Count('id')).values('count'),
+            output_field=IntegerField()
+        ), 0)
+        total = Coalesce(Subquery(
+            reviews.annotate(total=Sum('score')).values('total'),
+            output_field=IntegerField()
+        ), 0)
+        # UPDATE выборки не вызывает сигналы, сбрасывающие кэш ответов.
+        generations.bump(generations.TITLES)
+        return self.update(
+            reviews_count=count,
+            scores_sum=total,
+            rating=rating_expression(count, total),
+            modified=timezone.now(),
+        )
+
+
 class Title(models.Model):
     """Класс произведения. Хранит в себе названия произведений."""
 
@@ -93,6 +141,14 @@ class Title(models.Model):
         null=True,
         verbose_name='рейтинг'
     )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество отзывов'
+    )
+    scores_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='сумма оценок'
+    )
     description = models.TextField(
         blank=True,
         null=True,
@@ -107,6 +163,12 @@ class Title(models.Model):
     genre = models.ManyToManyField(
         Genre,
         related_name='titles')
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'произведение'
@@ -117,13 +179,61 @@ class Title(models.Model):
                 name='unique_follow_relation'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('category', 'year'),
+                name='title_category_year_idx'
+            ),
+            models.Index(fields=('year',), name='title_year_idx'),
+        )
 
     def update_rating(self):
-        """Функция для обновления рейтинга для вызова при работе с отзыами."""
-        self.rating = round(mean(
-            [review.score for review in self.reviews.all()]
-        ))
-        self.save()
+        """Полный пересчёт агрегатов рейтинга по отзывам произведения."""
+        Title.objects.filter(pk=self.pk).update_ratings()
+        self.refresh_from_db(
+            fields=('reviews_count', 'scores_sum', 'rating')
+        )
+
+    def change_scores(self, count_delta, sum_delta):
+        """Атомарно сдвигает агрегаты рейтинга одним UPDATE.
+
+        Стоимость не зависит от количества отзывов: новые значения
+        счётчиков и рейтинга вычисляются в SQL через F-выражения.
+        При DEFERRED_RATINGS произведение только отмечается для
+        пересчёта командой refreshratings.
+        """
+        if settings.DEFERRED_RATINGS:
+            # Отметка ставится после фиксации отзыва: если обработчик уже
+            # снял прежнюю отметку, его пересчёт увидит этот отзыв либо
+            # отметка появится заново.
+            transaction.on_commit(
+                lambda: DirtyTitle.objects.mark([self.pk])
+            )
+            return
+        CategoryStats.objects.for_titles([self.pk]).shift(
+            count_delta, sum_delta
+        )
+        GenreStats.objects.for_titles([self.pk]).shift(
+            count_delta, sum_delta
+        )
+        count = F('reviews_count') + count_delta
+        total = F('scores_sum') + sum_delta
+        generations.bump(generations.TITLES)
+        Title.objects.filter(pk=self.pk).update(
+            reviews_count=count,
+            scores_sum=total,
+            rating=rating_expression(count, total),
+            modified=timezone.now(),
+        )
+
+    def add_score(self, score):
+        self.change_scores(1, score)
+
+    def remove_score(self, score):
+        self.change_scores(-1, -score)
+
+    def replace_score(self, old_score, new_score):
+        self.change_scores(0, new_score - old_score)
 
     def __str__(self):
         return self.STR_PRESENTATION.format(
@@ -159,18 +269,42 @@ class Review(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации отзыва'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения отзыва'
+    )
 
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         default_related_name = 'reviews'
-        ordering = ['pub_date']
+        ordering = ['pub_date', 'id']
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
                 name='unique_review'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            )
+        ]
+
+    def locked_score(self):
+        """Текущая оценка из БД с блокировкой строки до конца транзакции.
+
+        Сдвиг рейтинга при изменении и удалении считается от этой оценки.
+        Строка блокируется записью, а не SELECT ... FOR UPDATE: UPDATE
+        держит блокировку строки на PostgreSQL и сразу берёт блокировку
+        записи на SQLite, где чтение перед записью в той же транзакции
+        приводит к взаимной блокировке. None, если отзыв уже удалён.
+        """
+        reviews = Review.objects.filter(pk=self.pk)
+        if not reviews.update(modified=timezone.now()):
+            return None
+        return reviews.values_list('score', flat=True).get()
 
 
 class Comment(models.Model):
@@ -191,9 +325,207 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации комментария'
     )
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения комментария'
+    )
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
-        ordering = ['pub_date']
+        ordering = ['pub_date', 'id']
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            )
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку командой sendmail."""
+
+    subject = models.CharField(max_length=255, verbose_name='тема')
+    body = models.TextField(verbose_name='текст')
+    from_email = models.CharField(
+        max_length=254,
+        blank=True,
+        null=True,
+        verbose_name='отправитель'
+    )
+    recipient = models.EmailField(verbose_name='получатель')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='дата постановки в очередь'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='неудачные попытки'
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='время следующей попытки'
+    )
+    last_error = models.TextField(blank=True, verbose_name='последняя ошибка')
+
+    class Meta:
+        verbose_name = 'исходящее письмо'
+        verbose_name_plural = 'исходящие письма'
+        ordering = ['next_attempt', 'id']
+        indexes = [
+            models.Index(
+                fields=['attempts', 'next_attempt'],
+                name='outgoing_email_due_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+class DirtyTitleQuerySet(models.QuerySet):
+    def mark(self, title_ids):
+        """Отмечает произведения, уже отмеченные пропускаются."""
+        self.bulk_create(
+            [DirtyTitle(title_id=title_id) for title_id in title_ids],
+            ignore_conflicts=True
+        )
+
+
+class DirtyTitle(models.Model):
+    """Произведение, рейтинг которого пересчитает команда refreshratings."""
+
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='произведение'
+    )
+    marked = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='время отметки'
+    )
+
+    objects = DirtyTitleQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'произведение к пересчёту рейтинга'
+        verbose_name_plural = 'произведения к пересчёту рейтинга'
+        ordering = ['marked']
+
+    def __str__(self):
+        return str(self.title_id)
+
+
+def stats_expressions(titles):
+    """Агрегаты статистики по выборке произведений одной группы.
+
+    Отзывы не читаются: суммируются счётчики, хранимые в Title.
+    """
+    def aggregate(expression):
+        return Coalesce(Subquery(
+            titles.annotate(value=expression).values('value'),
+            output_field=IntegerField()
+        ), 0)
+
+    return {
+        'titles_count': aggregate(Count('id')),
+        'reviews_count': aggregate(Sum('reviews_count')),
+        'scores_sum': aggregate(Sum('scores_sum')),
+    }
+
+
+class StatsQuerySet(models.QuerySet):
+    group_field = None
+
+    def for_titles(self, title_ids):
+        """Статистика групп, в которые входят произведения."""
+        return self.filter(**{
+            f'{self.group_field}__titles__in': title_ids
+        })
+
+    def shift(self, reviews_delta, scores_delta):
+        """Сдвигает счётчики отзывов одним UPDATE."""
+        return self.update(
+            reviews_count=F('reviews_count') + reviews_delta,
+            scores_sum=F('scores_sum') + scores_delta,
+        )
+
+    def refresh(self):
+        """Пересчитывает статистику выборки групп одним UPDATE."""
+        titles = Title.objects.filter(**{
+            self.group_field: OuterRef(self.group_field)
+        }).order_by().values(self.group_field)
+        return self.update(**stats_expressions(titles))
+
+
+class CategoryStatsQuerySet(StatsQuerySet):
+    group_field = 'category'
+
+
+class GenreStatsQuerySet(StatsQuerySet):
+    group_field = 'genre'
+
+
+class DictionaryStats(models.Model):
+    """Статистика произведений группы, хранимая для быстрого чтения.
+
+    Счётчики отзывов сдвигаются вместе с рейтингом произведения, число
+    произведений пересчитывается при изменении их категории и жанров.
+    """
+
+    titles_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество произведений'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество отзывов'
+    )
+    scores_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='сумма оценок'
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_score(self):
+        if not self.reviews_count:
+            return None
+        return round(self.scores_sum / self.reviews_count, 2)
+
+
+class CategoryStats(DictionaryStats):
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='категория'
+    )
+
+    objects = CategoryStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'статистика категории'
+        verbose_name_plural = 'статистика категорий'
+
+
+class GenreStats(DictionaryStats):
+    genre = models.OneToOneField(
+        Genre,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='жанр'
+    )
+
+    objects = GenreStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'статистика жанра'
+        verbose_name_plural = 'статистика жанров'
@@ -0,0 +1,126 @@
+"""Очередь исходящих писем.
+
+При EMAIL_OUTBOX письма не отправляются в запросе, а сохраняются в
+таблицу OutgoingEmail и отправляются командой sendmail. Обработчик
+забирает пакет писем, продлевая им время следующей попытки на
+EMAIL_OUTBOX_LEASE секунд, поэтому несколько обработчиков не отправят
+одно письмо дважды, а письма упавшего обработчика вернутся в очередь
+(и могут быть отправлены повторно, если сбой случился после отправки).
+Неудачная попытка откладывает письмо с экспоненциально растущей
+паузой, после EMAIL_OUTBOX_MAX_ATTEMPTS попыток письмо остаётся в
+таблице с последней ошибкой и больше не отправляется.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from reviews.models import OutgoingEmail
+
+
+def send_mail(subject, message, recipient, from_email=None):
+    """Отправляет письмо сразу или ставит его в очередь."""
+    if not settings.EMAIL_OUTBOX:
+        mail.send_mail(
+            subject=subject,
+            message=message,
+            from_email=from_email,
+            recipient_list=[recipient],
+        )
+        return
+    OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipient=recipient,
+    )
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой после attempts неудачных."""
+    return timedelta(seconds=min(
+        settings.EMAIL_OUTBOX_BACKOFF * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_MAX_BACKOFF
+    ))
+
+
+def due():
+    return OutgoingEmail.objects.filter(
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        next_attempt__lte=timezone.now()
+    )
+
+
+def claim(batch_size):
+    """Забирает пакет писем, готовых к отправке."""
+    with transaction.atomic():
+        emails = list(
+            due().select_for_update(skip_locked=True)[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt=timezone.now() + timedelta(
+            seconds=settings.EMAIL_OUTBOX_LEASE
+        ))
+    return emails
+
+
+def deliver(emails, connection):
+    """Отправляет письма через одно открытое соединение.
+
+    Ошибка одного письма не мешает остальным. Возвращает число
+    отправленных писем, они удаляются из очереди одним запросом.
+    """
+    sent = []
+    for email in emails:
+        message = mail.EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email,
+            to=[email.recipient],
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            reopen(connection)
+            attempts = email.attempts + 1
+            OutgoingEmail.objects.filter(pk=email.pk).update(
+                attempts=F('attempts') + 1,
+                next_attempt=timezone.now() + backoff(attempts),
+                last_error=repr(error),
+            )
+        else:
+            sent.append(email.pk)
+    OutgoingEmail.objects.filter(pk__in=sent).delete()
+    return len(sent)
+
+
+def reopen(connection):
+    """Заменяет соединение, которое могло оборваться.
+
+    Если новое не открывается, следующее письмо попробует открыть его
+    само, но тогда бэкенд закроет соединение сразу после отправки.
+    """
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        pass
+
+
+def queue_depth():
+    """Число писем: ожидающих отправки, готовых сейчас и отвергнутых."""
+    max_attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    return {
+        'pending': OutgoingEmail.objects.filter(
+            attempts__lt=max_attempts
+        ).count(),
+        'due': due().count(),
+        'failed': OutgoingEmail.objects.filter(
+            attempts__gte=max_attempts
+        ).count(),
+    }
@@ -0,0 +1,80 @@
+"""Отложенный пересчёт рейтингов.
+
+При DEFERRED_RATINGS запись отзыва не меняет агрегаты произведения, а
+отмечает его в таблице DirtyTitle. Команда refreshratings пакетами
+снимает отметки и пересчитывает рейтинги отмеченных произведений одним
+UPDATE, поэтому сотни отзывов к одному произведению между проходами
+обходятся одним агрегирующим запросом. Проход забирает только отметки,
+сделанные до его начала, после прохода обработчик ждёт интервал, даже
+если появились новые. Рейтинг отстаёт от отзывов не больше чем на
+интервал обработчика и время прохода.
+"""
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from reviews import stats
+from reviews.models import DirtyTitle, Title
+
+
+def refresh(batch_size, marked_before=None):
+    """Пересчитывает рейтинги пакета отмеченных произведений.
+
+    Отметки снимаются в той же транзакции. Несколько обработчиков
+    забирают разные пакеты. marked_before ограничивает пакет отметками,
+    сделанными не позже этого момента. Возвращает число произведений в
+    пакете.
+    """
+    marks = DirtyTitle.objects.select_for_update(skip_locked=True)
+    if marked_before is not None:
+        marks = marks.filter(marked__lte=marked_before)
+    with transaction.atomic():
+        title_ids = list(
+            marks.values_list('title_id', flat=True)[:batch_size]
+        )
+        if not title_ids:
+            return 0
+        DirtyTitle.objects.filter(title_id__in=title_ids).delete()
+        reconcile(title_ids)
+    return len(title_ids)
+
+
+def drain(batch_size):
+    """Пакетами пересчитывает рейтинги, отмеченные до начала прохода.
+
+    Отметки, сделанные во время прохода, остаются следующему: иначе при
+    непрерывной записи обработчик пересчитывал бы произведение после
+    каждого отзыва. Возвращает число пересчитанных произведений.
+    """
+    started = timezone.now()
+    total = 0
+    while True:
+        refreshed = refresh(batch_size, marked_before=started)
+        total += refreshed
+        if refreshed < batch_size:
+            return total
+
+
+def reconcile(title_ids):
+    """Пересчитывает по отзывам рейтинги произведений и их статистику.
+
+    Нужен, когда отзывы удалены в обход Title.change_scores: каскадом
+    при удалении автора или из админки.
+    """
+    Title.objects.filter(pk__in=title_ids).update_ratings()
+    stats.refresh_titles(title_ids)
+
+
+def backlog():
+    """Число отмеченных произведений и возраст старейшей отметки."""
+    dirty = DirtyTitle.objects.aggregate(
+        count=Count('title'), oldest=Min('marked')
+    )
+    oldest = dirty['oldest']
+    return {
+        'dirty': dirty['count'],
+        'oldest_seconds': (
+            round((timezone.now() - oldest).total_seconds(), 1)
+            if oldest else None
+        ),
+    }
@@ -0,0 +1,120 @@
+"""Поиск подстроки по названию произведения, слагам категории и жанров.
+
+icontains превращается в LIKE '%x%', который не обслуживается обычным
+индексом. Бэкенд выбирается по СУБД:
+
+* SQLite - таблица FTS5 с токенизатором trigram, rowid совпадает с id
+  произведения; синхронизируется сигналами из reviews.signals;
+* PostgreSQL - GIN-индексы pg_trgm по UPPER(...), которыми PostgreSQL
+  сам обслуживает icontains, синхронизация не нужна;
+* остальные СУБД - icontains без ускорения.
+"""
+from django.db import connection
+
+SEARCH_TABLE = 'reviews_title_search'
+# Триграммный индекс находит только подстроки от трёх символов.
+MIN_QUERY_LENGTH = 3
+LOOKUPS = {
+    'name': 'name__icontains',
+    'category': 'category__slug__icontains',
+    'genre': 'genre__slug__icontains',
+}
+
+
+class IcontainsSearch:
+    def filter(self, queryset, field, value):
+        queryset = queryset.filter(**{LOOKUPS[field]: value})
+        if field == 'genre':
+            queryset = queryset.distinct()
+        return queryset
+
+    def index_titles(self, title_ids):
+        pass
+
+    def remove_titles(self, title_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class PostgresTrigramSearch(IcontainsSearch):
+    """icontains, обслуживаемый индексами из миграции 0006."""
+
+
+class SQLiteTrigramSearch(IcontainsSearch):
+    COLUMNS = {'name': 'name', 'category': 'category', 'genre': 'genres'}
+    INSERT_SQL = f'''
+        INSERT INTO {SEARCH_TABLE} (rowid, name, category, genres)
+        SELECT title.id, title.name, COALESCE(category.slug, ''),
+               COALESCE((
+                   SELECT GROUP_CONCAT(genre.slug, ' ')
+                   FROM reviews_title_genre AS link
+                   JOIN reviews_genre AS genre ON genre.id = link.genre_id
+                   WHERE link.title_id = title.id
+               ), '')
+        FROM reviews_title AS title
+        LEFT JOIN reviews_category AS category
+            ON category.id = title.category_id
+    '''
+
+    def filter(self, queryset, field, value):
+        if len(value) < MIN_QUERY_LENGTH:
+            return super().filter(queryset, field, value)
+        phrase = '"{}"'.format(value.replace('"', '""'))
+        # id__in=RawSQL(...) даёт IN ((SELECT ...)), что SQLite читает как
+        # скалярный подзапрос с одной строкой, поэтому условие через extra.
+        return queryset.extra(
+            where=[
+                f'{queryset.model._meta.db_table}.id IN ('
+                f'SELECT rowid FROM {SEARCH_TABLE} '
+                f'WHERE {self.COLUMNS[field]} MATCH %s)'
+            ],
+            params=[phrase]
+        )
+
+    def index_titles(self, title_ids):
+        """Перестраивает строки индекса для произведений одним INSERT."""
+        title_ids = list(title_ids)
+        if not title_ids:
+            return
+        self.remove_titles(title_ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{self.INSERT_SQL} WHERE title.id IN '
+                f'({", ".join(["%s"] * len(title_ids))})',
+                title_ids
+            )
+
+    def remove_titles(self, title_ids):
+        title_ids = list(title_ids)
+        if not title_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+                f'({", ".join(["%s"] * len(title_ids))})',
+                title_ids
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(self.INSERT_SQL)
+
+
+_backend = None
+
+
+def get_backend():
+    """Бэкенд для основной БД; таблица FTS5 ищется один раз за процесс."""
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresTrigramSearch()
+        elif (connection.vendor == 'sqlite'
+              and SEARCH_TABLE in connection.introspection.table_names()):
+            _backend = SQLiteTrigramSearch()
+        else:
+            _backend = IcontainsSearch()
+    return _backend
@@ -0,0 +1,264 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from reviews import dictionaries, generations, ratings
+from reviews.models import (Category, CategoryStats, Comment, Genre,
+                            GenreStats, Review, Title, User)
+from reviews.search import get_backend
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    get_backend().index_titles([instance.pk])
+
+
+@receiver(post_delete, sender=Title)
+def remove_title(sender, instance, **kwargs):
+    get_backend().remove_titles([instance.pk])
+
+
+def changed_title_ids(instance, action, reverse, pk_set):
+    """Произведения, чьи жанры изменило событие m2m_changed, или None."""
+    if reverse and action == 'pre_clear':
+        instance.search_title_ids = list(
+            instance.titles.values_list('id', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return None
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return instance.search_title_ids
+    return pk_set
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def index_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    title_ids = changed_title_ids(instance, action, reverse, pk_set)
+    if title_ids is not None:
+        get_backend().index_titles(title_ids)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def index_dictionary_titles(sender, instance, created, **kwargs):
+    if not created:
+        get_backend().index_titles(
+            instance.titles.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def remember_dictionary_titles(sender, instance, **kwargs):
+    instance.search_title_ids = list(
+        instance.titles.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def index_orphaned_titles(sender, instance, **kwargs):
+    get_backend().index_titles(getattr(instance, 'search_title_ids', ()))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def clear_dictionary(sender, **kwargs):
+    dictionaries.clear(sender)
+
+
+# Ресурсы API, ответы которых зависят от данных модели. Рейтинг в ответах
+# о произведениях меняется вместе с отзывами. Имена авторов отзывов и
+# комментариев сбрасывает bump_authored_generations.
+CACHED_RESOURCES = {
+    Title: (generations.TITLES,),
+    Title.genre.through: (generations.TITLES,),
+    Category: (generations.CATEGORIES, generations.TITLES),
+    Genre: (generations.GENRES, generations.TITLES),
+    Review: (generations.REVIEWS, generations.TITLES),
+    Comment: (generations.COMMENTS,),
+}
+
+
+def bump_generations(sender, **kwargs):
+    generations.bump(*CACHED_RESOURCES[sender])
+
+
+for model in CACHED_RESOURCES:
+    if model is Title.genre.through:
+        m2m_changed.connect(bump_generations, sender=model)
+    else:
+        post_save.connect(bump_generations, sender=model)
+        post_delete.connect(bump_generations, sender=model)
+
+
+# Из данных пользователя ответы содержат только имя автора. Отзывы и
+# комментарии удалённого пользователя удаляются каскадом с сигналами
+# своих моделей.
+@receiver(pre_save, sender=User)
+def remember_saved_username(sender, instance, **kwargs):
+    instance.saved_username = None
+    if not instance._state.adding:
+        instance.saved_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+def username_changed(instance):
+    saved = instance.saved_username
+    return saved is not None and saved != instance.username
+
+
+@receiver(post_save, sender=User)
+def bump_authored_generations(sender, instance, **kwargs):
+    if username_changed(instance):
+        generations.bump(generations.REVIEWS, generations.COMMENTS)
+
+
+# Поле modified служит валидатором условных GET-запросов. Ответы о
+# произведениях включают категорию и жанры, ответы об отзывах - название
+# произведения, ответы о комментариях - текст отзыва, а те и другие -
+# имя автора, поэтому их изменения переносятся на зависимые строки.
+# Удаление справочника обнуляет связи без сигналов, затронутые
+# произведения запоминает remember_dictionary_titles.
+def touch(queryset):
+    queryset.update(modified=timezone.now())
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    title_ids = changed_title_ids(instance, action, reverse, pk_set)
+    if title_ids is not None:
+        touch(Title.objects.filter(pk__in=title_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def touch_dictionary_titles(sender, instance, created, **kwargs):
+    if not created:
+        touch(instance.titles.all())
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def touch_orphaned_titles(sender, instance, **kwargs):
+    touch(Title.objects.filter(
+        pk__in=getattr(instance, 'search_title_ids', ())
+    ))
+
+
+@receiver(pre_save, sender=Title)
+def remember_saved_title(sender, instance, **kwargs):
+    """Сохранённые в БД название и категория изменяемого произведения."""
+    instance.saved_title = None
+    if not instance._state.adding:
+        instance.saved_title = Title.objects.filter(
+            pk=instance.pk
+        ).values('name', 'category_id').first()
+
+
+@receiver(post_save, sender=Title)
+def touch_title_reviews(sender, instance, created, **kwargs):
+    saved = instance.saved_title
+    if saved is not None and saved['name'] != instance.name:
+        touch(Review.objects.filter(title=instance))
+
+
+@receiver(post_save, sender=Review)
+def touch_review_comments(sender, instance, created, update_fields,
+                          **kwargs):
+    if not created and (update_fields is None or 'text' in update_fields):
+        touch(Comment.objects.filter(review=instance))
+
+
+@receiver(post_save, sender=User)
+def touch_authored(sender, instance, **kwargs):
+    if username_changed(instance):
+        touch(Review.objects.filter(author=instance))
+        touch(Comment.objects.filter(author=instance))
+
+
+# Статистика категорий и жанров: число произведений в группе меняется
+# при создании, удалении и переносе произведения, группы пересчитываются
+# по хранимым в Title агрегатам.
+@receiver(post_save, sender=Category)
+def create_category_stats(sender, instance, created, **kwargs):
+    if created:
+        CategoryStats.objects.create(category=instance)
+
+
+@receiver(post_save, sender=Genre)
+def create_genre_stats(sender, instance, created, **kwargs):
+    if created:
+        GenreStats.objects.create(genre=instance)
+
+
+@receiver(post_save, sender=Title)
+def refresh_category_stats(sender, instance, **kwargs):
+    # Прежнюю категорию запоминает remember_saved_title.
+    category_ids = {instance.category_id}
+    if instance.saved_title is not None:
+        category_ids.add(instance.saved_title['category_id'])
+    CategoryStats.objects.filter(category_id__in=category_ids).refresh()
+
+
+def changed_genre_ids(instance, action, reverse, pk_set):
+    """Жанры, чьи произведения изменило событие m2m_changed, или None."""
+    if not reverse and action == 'pre_clear':
+        instance.stats_genre_ids = list(
+            instance.genre.values_list('id', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return None
+    if reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return instance.stats_genre_ids
+    return pk_set
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def refresh_genre_stats(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    genre_ids = changed_genre_ids(instance, action, reverse, pk_set)
+    if genre_ids is not None:
+        GenreStats.objects.filter(genre_id__in=genre_ids).refresh()
+
+
+@receiver(pre_delete, sender=Title)
+def remember_title_genres(sender, instance, **kwargs):
+    instance.stats_genre_ids = list(
+        instance.genre.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Title)
+def refresh_deleted_title_stats(sender, instance, **kwargs):
+    CategoryStats.objects.filter(
+        category_id=instance.category_id
+    ).refresh()
+    GenreStats.objects.filter(
+        genre_id__in=instance.stats_genre_ids
+    ).refresh()
+
+
+# Отзывы удалённого пользователя удаляются каскадом, минуя
+# Title.change_scores, поэтому рейтинги их произведений пересчитываются.
+@receiver(pre_delete, sender=User)
+def remember_reviewed_titles(sender, instance, **kwargs):
+    instance.reviewed_title_ids = list(
+        Review.objects.filter(author=instance).order_by().values_list(
+            'title_id', flat=True
+        ).distinct()
+    )
+
+
+@receiver(post_delete, sender=User)
+def reconcile_reviewed_titles(sender, instance, **kwargs):
+    if instance.reviewed_title_ids:
+        ratings.reconcile(instance.reviewed_title_ids)
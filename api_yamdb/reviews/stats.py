@@ -0,0 +1,31 @@
+"""Статистика произведений по категориям и жанрам.
+
+CategoryStats и GenreStats хранят число произведений, отзывов и сумму
+оценок группы, чтобы не агрегировать Title, Review и связи с жанрами
+при каждом чтении. Запись отзыва сдвигает счётчики в Title.change_scores,
+изменение категории или жанров произведения пересчитывает затронутые
+группы по хранимым в Title агрегатам (reviews.signals). Команда
+rebuildstats пересчитывает всё заново.
+"""
+from reviews.models import Category, CategoryStats, Genre, GenreStats
+
+
+def refresh_titles(title_ids):
+    """Пересчитывает статистику групп, в которые входят произведения."""
+    CategoryStats.objects.for_titles(title_ids).refresh()
+    GenreStats.objects.for_titles(title_ids).refresh()
+
+
+def rebuild():
+    """Создаёт недостающие строки и пересчитывает всю статистику."""
+    CategoryStats.objects.bulk_create(
+        [CategoryStats(category_id=pk)
+         for pk in Category.objects.values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+    GenreStats.objects.bulk_create(
+        [GenreStats(genre_id=pk)
+         for pk in Genre.objects.values_list('pk', flat=True)],
+        ignore_conflicts=True
+    )
+    return CategoryStats.objects.refresh() + GenreStats.objects.refresh()
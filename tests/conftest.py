@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -34,3 +35,11 @@ assert get_version() < '3.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш Django не очищается вместе с тестовой БД."""
+    from django.core.cache import cache
+
+    cache.clear()
@@ -0,0 +1,198 @@
+import pytest
+
+from .common import auth_client, create_reviews
+
+
+class Test08RatingAggregates:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_aggregates_follow_review_writes(self, admin_client, admin):
+        from reviews.models import Title
+
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.scores_sum, title.rating) == (3, 12, 4), (
+            'Проверьте, что при добавлении отзывов обновляются счётчик отзывов, '
+            'сумма оценок и рейтинг произведения'
+        )
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/',
+            data={'score': 10}
+        )
+        assert response.status_code == 200
+        title.refresh_from_db()
+        assert (title.reviews_count, title.scores_sum, title.rating) == (3, 17, 5), (
+            'Проверьте, что при изменении оценки отзыва пересчитываются '
+            'сумма оценок и рейтинг произведения'
+        )
+
+        response = auth_client(user).delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/'
+        )
+        assert response.status_code == 204
+        title.refresh_from_db()
+        assert (title.reviews_count, title.scores_sum, title.rating) == (2, 14, 7), (
+            'Проверьте, что при удалении отзыва пересчитываются '
+            'счётчик отзывов, сумма оценок и рейтинг произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rating_reset_without_reviews(self, admin_client, admin):
+        from reviews.models import Title
+
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        for review in reviews:
+            admin_client.delete(
+                f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+            )
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.reviews_count, title.scores_sum, title.rating) == (0, 0, None), (
+            'Проверьте, что после удаления всех отзывов рейтинг произведения сбрасывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_update_rating_matches_aggregates(self, admin_client, admin):
+        from reviews.models import Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.filter(pk=titles[0]['id']).update(
+            reviews_count=0, scores_sum=0, rating=None
+        )
+        title = Title.objects.get(pk=titles[0]['id'])
+        title.update_rating()
+        title.refresh_from_db()
+        assert (title.reviews_count, title.scores_sum, title.rating) == (3, 12, 4), (
+            'Проверьте, что `Title.update_rating` восстанавливает агрегаты по отзывам'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_title_list_serves_stored_rating(self, admin_client, admin, client):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['rating'] == 4, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/` '
+            'возвращается рейтинг произведения'
+        )
+        assert 'reviews_count' not in data and 'scores_sum' not in data, (
+            'Проверьте, что служебные агрегаты рейтинга не попадают в ответ API'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_syncratings_command(self, admin_client, admin):
+        from django.core.management import call_command
+        from reviews.models import CategoryStats, GenreStats, Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(reviews_count=7, scores_sum=70, rating=10)
+        CategoryStats.objects.update(reviews_count=7, scores_sum=70)
+        GenreStats.objects.update(reviews_count=7, scores_sum=70)
+        call_command('syncratings', batch_size=1)
+        ratings = dict(Title.objects.values_list('id', 'rating'))
+        assert ratings == {titles[0]['id']: 4, titles[1]['id']: None}, (
+            'Проверьте, что команда `syncratings` пересчитывает рейтинги всех произведений'
+        )
+        assert Title.objects.filter(reviews_count=7).count() == 0
+        assert not (CategoryStats.objects.filter(reviews_count=7).exists()
+                    or GenreStats.objects.filter(reviews_count=7).exists()), (
+            'Проверьте, что команда `syncratings` пересчитывает статистику '
+            'категорий и жанров'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_cascade_deletes_reconcile_aggregates(self, admin_client,
+                                                    django_user_model):
+        from reviews.models import Category, CategoryStats, Review, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Тайтл', year=2000,
+                                     category=category)
+        for username, score in (('low', 2), ('high', 10)):
+            author = django_user_model.objects.create_user(
+                username=username, email=f'{username}@yamdb.fake'
+            )
+            Review.objects.create(title=title, author=author, text='т',
+                                  score=score)
+            title.add_score(score)
+        response = admin_client.delete('/api/v1/users/high/')
+        assert response.status_code == 204
+        title.refresh_from_db()
+        assert (title.reviews_count, title.scores_sum, title.rating) == (1, 2, 2), (
+            'Проверьте, что при удалении пользователя пересчитываются '
+            'рейтинги произведений с его отзывами'
+        )
+        stats = CategoryStats.objects.get(category=category)
+        assert (stats.reviews_count, stats.scores_sum) == (1, 2)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_rating_truncates_mean(self, django_user_model):
+        from reviews.models import Category, Review, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Тайтл', year=2000,
+                                     category=category)
+        for username, score in (('first', 5), ('second', 6)):
+            author = django_user_model.objects.create_user(
+                username=username, email=f'{username}@yamdb.fake'
+            )
+            Review.objects.create(title=title, author=author, text='т',
+                                  score=score)
+            title.add_score(score)
+        title.refresh_from_db()
+        assert title.rating == 5, (
+            'Проверьте, что рейтинг произведения - средняя оценка '
+            'с отброшенной дробной частью'
+        )
+        Title.objects.filter(pk=title.pk).update_ratings()
+        title.refresh_from_db()
+        assert title.rating == 5, (
+            'Проверьте, что пересчёт рейтинга отбрасывает дробную часть '
+            'средней оценки'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_migration_fills_rating(self):
+        from django.db import connection
+        from django.db.migrations.executor import MigrationExecutor
+
+        before = [('reviews', '0002_auto_20221201_0515')]
+        after = [('reviews', '0003_title_rating_aggregates')]
+        executor = MigrationExecutor(connection)
+        latest = executor.loader.graph.leaf_nodes('reviews')
+        executor.migrate(before)
+        try:
+            apps = executor.loader.project_state(before).apps
+            Category = apps.get_model('reviews', 'Category')
+            Title = apps.get_model('reviews', 'Title')
+            Review = apps.get_model('reviews', 'Review')
+            User = apps.get_model('reviews', 'User')
+            category = Category.objects.create(name='Фильм', slug='films')
+            reviewed = Title.objects.create(
+                name='С отзывами', year=2000, category=category, rating=5
+            )
+            Title.objects.create(
+                name='Без отзывов', year=2000, category=category, rating=7
+            )
+            for username, score in (('first', 4), ('second', 5)):
+                Review.objects.create(
+                    title=reviewed, text='т', score=score,
+                    author=User.objects.create(
+                        username=username, email=f'{username}@yamdb.fake'
+                    )
+                )
+            executor = MigrationExecutor(connection)
+            executor.migrate(after)
+            apps = executor.loader.project_state(after).apps
+            Title = apps.get_model('reviews', 'Title')
+            assert set(Title.objects.values_list(
+                'name', 'reviews_count', 'scores_sum', 'rating'
+            )) == {('С отзывами', 2, 9, 4), ('Без отзывов', 0, 0, None)}, (
+                'Проверьте, что миграция агрегатов пересчитывает и '
+                'хранимый рейтинг произведений'
+            )
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.loader.build_graph()
+            executor.migrate(latest)
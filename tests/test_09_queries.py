@@ -0,0 +1,154 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def add_titles(count):
+    from reviews.models import Category, Genre, Title
+
+    category, _ = Category.objects.get_or_create(name='Фильм', slug='films')
+    horror, _ = Genre.objects.get_or_create(name='Ужасы', slug='horror')
+    drama, _ = Genre.objects.get_or_create(name='Драма', slug='drama')
+    start = Title.objects.count()
+    for i in range(start, start + count):
+        title = Title.objects.create(
+            name=f'Тайтл {i}', year=2000, category=category
+        )
+        title.genre.set((horror, drama))
+    Category.objects.create(name=f'Категория {start}', slug=f'c{start}')
+    Genre.objects.create(name=f'Жанр {start}', slug=f'g{start}')
+    return title
+
+
+def add_reviews(count, django_user_model):
+    from reviews.models import Comment, Review, Title
+
+    title = Title.objects.first()
+    start = django_user_model.objects.count()
+    for i in range(start, start + count):
+        author = django_user_model.objects.create_user(
+            username=f'author{i}', email=f'author{i}@yamdb.fake'
+        )
+        Review.objects.create(
+            title=title, author=author, text='текст', score=5
+        )
+        Comment.objects.create(
+            review=title.reviews.first(), author=author, text='текст'
+        )
+    return title, title.reviews.first()
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что при GET запросе `{url}` возвращается статус 200'
+    )
+    return len(context.captured_queries)
+
+
+class Test09QueryCount:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?genre=horror',
+        '/api/v1/categories/',
+        '/api/v1/genres/',
+    ])
+    def test_01_title_lists(self, client, url):
+        add_titles(1)
+        small_page = count_queries(client, url)
+        add_titles(9)
+        full_page = count_queries(client, url)
+        assert full_page == small_page, (
+            f'Проверьте, что количество запросов к БД при GET запросе `{url}` '
+            'не зависит от количества объектов на странице'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_title_list_query_budget(self, client):
+        title = add_titles(10)
+        # Первый запрос загружает категории и жанры в кэш справочников.
+        count_queries(client, '/api/v1/titles/?year=2000')
+        assert count_queries(client, '/api/v1/titles/') == 3, (
+            'Проверьте, что список произведений загружается запросом `COUNT`, '
+            'одним запросом произведений и одним запросом связей с жанрами'
+        )
+        assert count_queries(client, f'/api/v1/titles/{title.id}/') == 2, (
+            'Проверьте, что произведение загружается одним запросом '
+            'и одним запросом связей с жанрами'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_and_comment_lists(self, client, django_user_model):
+        add_titles(1)
+        title, review = add_reviews(1, django_user_model)
+        urls = (
+            f'/api/v1/titles/{title.id}/reviews/',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+        )
+        small_page = [count_queries(client, url) for url in urls]
+        add_reviews(9, django_user_model)
+        full_page = [count_queries(client, url) for url in urls]
+        assert full_page == small_page, (
+            'Проверьте, что количество запросов к БД при GET запросе отзывов '
+            'и комментариев не зависит от количества объектов на странице'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_parent_objects_are_read_once(self, admin_client,
+                                              django_user_model):
+        add_titles(1)
+        title, review = add_reviews(1, django_user_model)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data={'text': 'т', 'score': 5})
+        assert response.status_code == 201
+        title_selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_title"' in query['sql']
+        ]
+        assert len(title_selects) == 1, (
+            'Проверьте, что при создании отзыва произведение читается '
+            'из БД один раз за запрос'
+        )
+        other = add_titles(1)
+        url = f'/api/v1/titles/{other.id}/reviews/{review.id}/comments/'
+        assert admin_client.get(url).status_code == 404, (
+            'Проверьте, что комментарии отзыва недоступны по адресу '
+            'другого произведения'
+        )
+        assert admin_client.post(url, data={'text': 'т'}).status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_duplicates_rejected_by_constraints(self, admin_client):
+        title = add_titles(1)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data={'text': 'т', 'score': 5})
+        assert response.status_code == 201
+        assert not [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql']
+        ], (
+            'Проверьте, что повтор отзыва определяется ограничением БД '
+            'без отдельного запроса перед записью'
+        )
+        response = admin_client.post(url, data={'text': 'т', 'score': 7})
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['Отзыв к данному произведению уже добавлен']
+        }
+        title.refresh_from_db()
+        assert (title.reviews_count, title.rating) == (1, 5), (
+            'Проверьте, что отклонённый повтор не меняет рейтинг'
+        )
+
+        data = {'name': title.name, 'year': title.year, 'genre': ['drama'],
+                'category': 'films'}
+        response = admin_client.post('/api/v1/titles/', data=data)
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': ['Такой тайтл уже есть']}
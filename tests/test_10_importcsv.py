@@ -0,0 +1,217 @@
+import json
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
+
+
+class Test10ImportCsv:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_import_static_data(self):
+        from reviews.models import Comment, Review, Title
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('importcsv')
+        assert len(context.captured_queries) < 30, (
+            'Проверьте, что команда `importcsv` загружает данные пакетно, '
+            'без запросов к БД на каждую строку файла'
+        )
+        assert Title.objects.count() == 32
+        assert Title.genre.through.objects.count() == 42
+        assert Comment.objects.count() == 3
+        assert Review.objects.exists()
+
+        titles = Title.objects.annotate(
+            count=Count('reviews'), total=Sum('reviews__score')
+        )
+        for title in titles:
+            assert (title.reviews_count, title.scores_sum) == (
+                title.count, title.total or 0
+            ), 'Проверьте, что после импорта пересчитаны агрегаты рейтинга'
+            if title.count:
+                assert title.rating == title.total // title.count, (
+                    'Проверьте, что после импорта пересчитаны рейтинги произведений'
+                )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_resume_interrupted_import(self, tmp_path):
+        from reviews.management.commands.importcsv import DATA_DIR
+        from reviews.models import Review
+
+        data_dir = tmp_path / 'data'
+        shutil.copytree(DATA_DIR, data_dir)
+        reviews = (data_dir / 'review.csv').read_text(encoding='utf-8')
+        broken = reviews.replace(',9,2019-', ',bad,2019-', 1)
+        assert broken != reviews
+        (data_dir / 'review.csv').write_text(broken, encoding='utf-8')
+
+        with pytest.raises(CommandError):
+            call_command(
+                'importcsv', data_dir=str(data_dir), batch_size=10,
+                stdout=StringIO()
+            )
+        loaded = Review.objects.count()
+        assert 0 < loaded < 72, (
+            'Проверьте, что команда `importcsv` фиксирует каждый пакет строк'
+        )
+        assert (data_dir / '.importcsv_checkpoint.json').exists()
+
+        (data_dir / 'review.csv').write_text(reviews, encoding='utf-8')
+        out = StringIO()
+        call_command(
+            'importcsv', data_dir=str(data_dir), batch_size=10, resume=True,
+            stdout=out
+        )
+        assert 'review: 72 rows' in out.getvalue(), (
+            'Проверьте, что команда `importcsv` сообщает о ходе импорта'
+        )
+        assert Review.objects.count() == 72
+        assert not (data_dir / '.importcsv_checkpoint.json').exists(), (
+            'Проверьте, что после успешного импорта контрольная точка удаляется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_fast_path_matches_orm_path(self):
+        from reviews.models import (Category, Comment, Genre, Review, Title,
+                                    User)
+
+        def snapshot():
+            return {
+                'users': list(User.objects.values_list(
+                    'id', 'username', 'email', 'role', 'bio', 'first_name',
+                    'last_name', 'password', 'is_active', 'is_staff'
+                )),
+                'titles': list(Title.objects.values_list(
+                    'id', 'name', 'year', 'category', 'rating',
+                    'reviews_count', 'scores_sum'
+                )),
+                'genres': sorted(Title.genre.through.objects.values_list(
+                    'title', 'genre'
+                )),
+                'reviews': list(Review.objects.order_by('id').values_list(
+                    'id', 'title', 'author', 'text', 'score', 'pub_date'
+                )),
+                'comments': list(Comment.objects.order_by('id').values_list(
+                    'id', 'review', 'author', 'text', 'pub_date'
+                )),
+            }
+
+        call_command('importcsv', stdout=StringIO())
+        expected = snapshot()
+        for model in (Comment, Review, Title, User, Category, Genre):
+            model.objects.all().delete()
+
+        call_command('importcsv', fast=True, batch_size=10, stdout=StringIO())
+        assert snapshot() == expected, (
+            'Проверьте, что `importcsv --fast` загружает те же данные, '
+            'что и импорт через ORM'
+        )
+        assert Review.objects.get(pk=1).pub_date.isoformat() == (
+            '2019-09-24T21:08:21.567000+00:00'
+        ), 'Проверьте, что `importcsv` сохраняет даты публикации из csv'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_benchimport_clears_imported_data(self):
+        from reviews.models import CategoryStats, Review, User
+
+        out = StringIO()
+        call_command(
+            'benchimport', users=5, titles=5, reviews_per_title=2,
+            comments_per_review=1, stdout=out
+        )
+        assert 'Fast path speedup' in out.getvalue()
+        assert not (Review.objects.exists() or User.objects.exists()
+                    or CategoryStats.objects.exists()), (
+            'Проверьте, что команда `benchimport` удаляет загруженные данные'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_parallel_import(self, tmp_path):
+        from reviews.management.commands.importcsv import (DATA_DIR,
+                                                           DEPENDENCIES)
+        from reviews.models import Comment, Review, Title, User
+
+        out = StringIO()
+        call_command(
+            'importcsv', data_dir=DATA_DIR, checkpoint=str(tmp_path / 'cp'),
+            jobs=2, batch_size=10, stdout=out
+        )
+        output = out.getvalue().splitlines()
+        parsed = [
+            line.rsplit(' ', 1)[1] for line in output
+            if line.startswith('Successfully parsed')
+        ]
+        assert sorted(parsed) == sorted(DEPENDENCIES)
+        for file, dependencies in DEPENDENCIES.items():
+            assert all(
+                parsed.index(dependency) < parsed.index(file)
+                for dependency in dependencies
+            ), (
+                'Проверьте, что `importcsv --jobs` загружает файл после '
+                'файлов, на которые он ссылается'
+            )
+        assert 'review: 72 rows' in output, (
+            'Проверьте, что `importcsv --jobs` собирает прогресс процессов'
+        )
+        assert (Title.objects.count(), Review.objects.count(),
+                Comment.objects.count()) == (32, 72, 3)
+        assert Title.genre.through.objects.count() == 42
+        assert User.objects.exists()
+        assert not (tmp_path / 'cp').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_parallel_import_stops_after_failure(self, tmp_path):
+        from reviews.management.commands.importcsv import DATA_DIR
+        from reviews.models import Comment, Genre, Review, Title, User
+
+        data_dir = tmp_path / 'data'
+        shutil.copytree(DATA_DIR, data_dir)
+        titles = (data_dir / 'titles.csv').read_text(encoding='utf-8')
+        lines = titles.splitlines()
+        id_, name, year, category = lines[-1].rsplit(',', 3)
+        lines[-1] = ','.join((id_, name, 'bad', category))
+        (data_dir / 'titles.csv').write_text(
+            '\n'.join(lines) + '\n', encoding='utf-8'
+        )
+
+        with pytest.raises(CommandError, match='titles'):
+            call_command(
+                'importcsv', data_dir=str(data_dir), jobs=2, batch_size=10,
+                stdout=StringIO()
+            )
+        assert User.objects.exists() and Genre.objects.exists()
+        assert 0 < Title.objects.count() < 32
+        assert not (Title.genre.through.objects.exists()
+                    or Review.objects.exists()
+                    or Comment.objects.exists()), (
+            'Проверьте, что после ошибки `importcsv --jobs` не запускает '
+            'загрузку файлов, зависящих от незагруженного'
+        )
+        checkpoint = json.loads(
+            (data_dir / '.importcsv_checkpoint.json').read_text()
+        )
+        assert checkpoint['users'] == User.objects.count()
+        assert checkpoint['titles'] == Title.objects.count(), (
+            'Проверьте, что контрольная точка учитывает пакеты, '
+            'загруженные процессами до ошибки'
+        )
+
+    def test_07_copy_rows_encoding(self):
+        from reviews.management.commands.importcsv import copy_buffer
+
+        buffer = copy_buffer([
+            (1, None, '', True, 'таб\tстрока\nслэш\\'),
+            (2, 'user', None, False, '\r'),
+        ])
+        assert buffer.getvalue() == (
+            '1\t\\N\t\tTrue\tтаб\\tстрока\\nслэш\\\\\n'
+            '2\tuser\t\\N\tFalse\t\\r\n'
+        ), (
+            'Проверьте, что для COPY значения None передаются как NULL, '
+            'а не пустая строка, и разделители экранируются'
+        )
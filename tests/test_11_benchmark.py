@@ -0,0 +1,74 @@
+import csv
+import json
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+class Test11Benchmark:
+
+    def test_01_dataset_is_skewed(self, tmp_path):
+        from reviews.management.dataset import write_dataset
+
+        counts = write_dataset(
+            tmp_path, users=50, categories=2, genres=3, titles=100,
+            reviews=1000, comments_per_review=1, skew=1.1
+        )
+        with open(tmp_path / 'review.csv', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        assert len(rows) == counts['review'] == 1000, (
+            'Проверьте, что `--reviews` задаёт общее число отзывов'
+        )
+        per_title = Counter(row['title_id'] for row in rows)
+        assert max(per_title.values()) == 50, (
+            'Проверьте, что у популярных произведений больше всего отзывов, '
+            'но не больше числа пользователей'
+        )
+        assert min(per_title.values()) * 10 < max(per_title.values()), (
+            'Проверьте, что отзывы распределены между произведениями неравномерно'
+        )
+        assert len({(row['title_id'], row['author']) for row in rows}) == len(rows), (
+            'Проверьте, что один пользователь пишет не больше одного отзыва '
+            'на произведение'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_generate_load_and_bench(self, tmp_path):
+        from reviews.models import Review, Title
+
+        call_command(
+            'generatedata', users=20, titles=30, reviews=200,
+            comments_per_review=1, load=True, stdout=StringIO()
+        )
+        assert Title.objects.count() == 30
+        assert Review.objects.count() == sum(
+            Title.objects.values_list('reviews_count', flat=True)
+        )
+
+        report_path = tmp_path / 'report.json'
+        call_command(
+            'benchapi', requests=3, warmup=0, output=str(report_path),
+            stdout=StringIO()
+        )
+        report = json.loads(report_path.read_text())
+        assert report['rows']['title'] == 30
+        for name in ('titles-list', 'reviews-list', 'comments-list'):
+            result = report['endpoints'][name]
+            assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+            assert result['queries'] > 0, (
+                'Проверьте, что отчёт `benchapi` содержит количество запросов к БД'
+            )
+
+    def test_03_reviews_are_capped_by_users(self, tmp_path):
+        from reviews.management.dataset import write_dataset
+
+        counts = write_dataset(
+            tmp_path, users=5, categories=1, genres=1, titles=4,
+            reviews=1000, comments_per_review=0, skew=2
+        )
+        assert counts['review'] == 20, (
+            'Проверьте, что отзывов не больше, чем пар пользователь - '
+            'произведение'
+        )
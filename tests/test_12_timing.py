@@ -0,0 +1,44 @@
+import json
+import logging
+import re
+
+import pytest
+
+from .common import create_reviews
+
+
+class Test12RequestTiming:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing_header(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+        header = response.get('Server-Timing')
+        assert header, (
+            'Проверьте, что ответ содержит заголовок `Server-Timing`'
+        )
+        metrics = dict(
+            re.match(r'(\w+);dur=([\d.]+)', metric.strip()).groups()
+            for metric in header.split(',')
+        )
+        assert set(metrics) == {'db', 'serializer', 'view', 'total'}
+        assert float(metrics['serializer']) > 0
+        assert float(metrics['total']) >= float(metrics['view']) >= float(metrics['db'])
+        assert re.search(r'desc="[1-9]\d* queries"', header), (
+            'Проверьте, что `Server-Timing` содержит количество запросов к БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_log_line_keyed_by_route(self, client, caplog):
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            client.get('/api/v1/titles/')
+            client.get('/api/v1/categories/')
+        records = [
+            json.loads(record.getMessage()) for record in caplog.records
+            if record.name == 'api.timing'
+        ]
+        assert [record['route'] for record in records] == [
+            'titles-list', 'categories-list'
+        ], 'Проверьте, что строка лога содержит имя маршрута DRF'
+        assert records[0]['queries'] >= 1
+        assert records[0]['status'] == 200
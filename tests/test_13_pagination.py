@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def fill_reviews(django_user_model, count):
+    from reviews.models import Category, Comment, Review, Title
+
+    title = Title.objects.create(
+        name='Тайтл', year=2000,
+        category=Category.objects.create(name='Фильм', slug='films')
+    )
+    for i in range(count):
+        author = django_user_model.objects.create_user(
+            username=f'author{i}', email=f'author{i}@yamdb.fake'
+        )
+        review = Review.objects.create(
+            title=title, author=author, text=str(i), score=5
+        )
+        Comment.objects.create(review=review, author=author, text=str(i))
+    # одинаковые даты проверяют разрешение равенства по id
+    now = timezone.now()
+    for i, review in enumerate(Review.objects.order_by('-id')):
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=now - timedelta(days=i // 3)
+        )
+    return title
+
+
+def walk(client, url, link):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что при GET запросе `{url}` возвращается статус 200'
+        )
+        data = response.json()
+        assert 'count' not in data
+        pages.append([item['id'] for item in data['results']])
+        url = data[link]
+    return pages
+
+
+class Test13KeysetPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_walk_forward_and_back(self, client, django_user_model):
+        from reviews.models import Review
+
+        title = fill_reviews(django_user_model, 25)
+        expected = list(Review.objects.order_by('pub_date', 'id').values_list(
+            'id', flat=True
+        ))
+        pages = walk(client, f'/api/v1/titles/{title.id}/reviews/?cursor=', 'next')
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == expected, (
+            'Проверьте, что keyset-пагинация отзывов упорядочена по '
+            '(pub_date, id) и не пропускает и не повторяет записи'
+        )
+
+        last = client.get(f'/api/v1/titles/{title.id}/reviews/?cursor=')
+        url = last.json()['next']
+        url = client.get(url).json()['next']
+        back = walk(client, client.get(url).json()['previous'], 'previous')
+        assert back == pages[1::-1], (
+            'Проверьте, что ссылка `previous` keyset-пагинации ведёт назад'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_no_count_and_offset(self, client, django_user_model):
+        title = fill_reviews(django_user_model, 15)
+        url = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor='
+        ).json()['next']
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'COUNT(' not in sql.upper() and 'OFFSET' not in sql.upper(), (
+            'Проверьте, что keyset-пагинация не выполняет COUNT(*) и OFFSET'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_comments_and_titles(self, client, django_user_model):
+        from reviews.models import Review
+
+        title = fill_reviews(django_user_model, 12)
+        review = Review.objects.first()
+        pages = walk(
+            client,
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/?cursor=',
+            'next'
+        )
+        assert len(sum(pages, [])) == 1
+        pages = walk(client, '/api/v1/titles/?cursor=', 'next')
+        assert sum(pages, []) == [title.id]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_page_number_by_default(self, client, django_user_model):
+        title = fill_reviews(django_user_model, 12)
+        data = client.get(f'/api/v1/titles/{title.id}/reviews/').json()
+        assert data['count'] == 12
+        response = client.get(f'/api/v1/titles/{title.id}/reviews/?cursor=xyz')
+        assert response.status_code == 404
@@ -0,0 +1,95 @@
+import re
+
+import pytest
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+# Справочники из десятков строк: полный просмотр для них дешевле индекса.
+SMALL_TABLES = {'reviews_category', 'reviews_genre'}
+
+
+def viewset_queryset(viewset, url, **kwargs):
+    request = Request(APIRequestFactory().get(url))
+    view = viewset(
+        action='list', kwargs=kwargs, request=request, format_kwarg=None
+    )
+    return view.filter_queryset(view.get_queryset())
+
+
+def full_scans(queryset):
+    """Строки плана SQLite с полным просмотром больших таблиц."""
+    scans = []
+    for line in queryset.explain().splitlines():
+        match = re.search(r'\bSCAN (?:TABLE )?(\w+)', line)
+        if match and 'INDEX' not in line and match[1] not in SMALL_TABLES:
+            scans.append(line)
+    return scans
+
+
+@pytest.fixture
+def data(django_user_model):
+    from reviews.models import Category, Comment, Genre, Review, Title
+
+    category = Category.objects.create(name='Фильм', slug='films')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Тайтл', year=2000, category=category)
+    title.genre.add(genre)
+    author = django_user_model.objects.create_user(
+        username='author', email='author@yamdb.fake'
+    )
+    review = Review.objects.create(
+        title=title, author=author, text='текст', score=5
+    )
+    Comment.objects.create(review=review, author=author, text='текст')
+    return title, review, author
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='планы проверяются для SQLite'
+)
+class Test14Indexes:
+
+    @pytest.mark.django_db
+    def test_01_nested_lists_use_indexes(self, data):
+        from api.views import CommentViewSet, ReviewViewSet
+
+        title, review, _ = data
+        querysets = {
+            'reviews': viewset_queryset(
+                ReviewViewSet, '/', title_id=title.id
+            ),
+            'comments': viewset_queryset(
+                CommentViewSet, '/', title_id=title.id, review_id=review.id
+            ),
+        }
+        for name, queryset in querysets.items():
+            assert full_scans(queryset[:10]) == [], (
+                f'Проверьте, что выборка {name} обслуживается составным индексом'
+            )
+            assert 'TEMP B-TREE' not in queryset[:10].explain(), (
+                f'Проверьте, что сортировка {name} берётся из индекса'
+            )
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('query', [
+        '?year=2000',
+        '?category=films&year=2000',
+        '?category_slug=films&year=2000',
+        '?genre_slug=drama,comedy',
+    ])
+    def test_02_title_filters_use_indexes(self, data, query):
+        from api.views import TitleViewSet
+
+        queryset = viewset_queryset(TitleViewSet, f'/{query}')
+        assert full_scans(queryset[:10]) == [], (
+            f'Проверьте, что фильтр произведений `{query}` использует индекс'
+        )
+
+    @pytest.mark.django_db
+    def test_03_review_uniqueness_check_uses_index(self, data):
+        from reviews.models import Review
+
+        title, _, author = data
+        queryset = Review.objects.filter(title=title, author=author)
+        assert full_scans(queryset) == []
@@ -0,0 +1,99 @@
+import pytest
+
+
+def found(client, query):
+    response = client.get(f'/api/v1/titles/{query}')
+    assert response.status_code == 200
+    return {title['name'] for title in response.json()['results']}
+
+
+@pytest.fixture
+def titles():
+    from reviews.models import Category, Genre, Title
+
+    films = Category.objects.create(name='Фильм', slug='films')
+    books = Category.objects.create(name='Книга', slug='books')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    comedy = Genre.objects.create(name='Комедия', slug='comedy')
+    turn = Title.objects.create(name='Крутой Поворот', year=2000,
+                                category=films)
+    turn.genre.set([drama, comedy])
+    project = Title.objects.create(name='Проект', year=2020, category=books)
+    project.genre.set([drama])
+    return films, comedy, turn, project
+
+
+class Test15Search:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_substring_filters(self, client, titles):
+        assert found(client, '?name=поворот') == {'Крутой Поворот'}, (
+            'Проверьте, что фильтр `name` ищет подстроку без учёта регистра'
+        )
+        assert found(client, '?name=ро') == {'Крутой Поворот', 'Проект'}, (
+            'Проверьте, что фильтр `name` работает для запросов короче '
+            'трёх символов'
+        )
+        assert found(client, '?genre=dram') == {'Крутой Поворот', 'Проект'}
+        assert found(client, '?genre=comedy&category=film') == {
+            'Крутой Поворот'
+        }, 'Проверьте, что фильтры по подстроке сочетаются друг с другом'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_index_follows_changes(self, client, titles):
+        films, comedy, turn, project = titles
+        films.slug = 'movies'
+        films.save()
+        assert found(client, '?category=movie') == {'Крутой Поворот'}, (
+            'Проверьте, что поиск учитывает изменение слага категории'
+        )
+        project.genre.add(comedy)
+        assert found(client, '?genre=comedy') == {'Крутой Поворот', 'Проект'}, (
+            'Проверьте, что поиск учитывает изменение жанров произведения'
+        )
+        comedy.delete()
+        assert found(client, '?genre=comedy') == set(), (
+            'Проверьте, что поиск учитывает удаление жанра'
+        )
+        turn.name = 'Разворот'
+        turn.save()
+        assert found(client, '?name=поворот') == set()
+        assert found(client, '?name=развор') == {'Разворот'}, (
+            'Проверьте, что поиск учитывает изменение названия произведения'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_after_bulk_load(self, client, titles):
+        from reviews.models import Title
+        from reviews.search import get_backend
+
+        Title.objects.bulk_create([Title(name='Без сигналов', year=2001)])
+        get_backend().rebuild()
+        assert found(client, '?name=сигнал') == {'Без сигналов'}, (
+            'Проверьте, что перестроение индекса учитывает строки, '
+            'добавленные в обход сигналов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_exact_slug_filters(self, client, titles):
+        from reviews.models import Genre
+
+        assert found(client, '?genre_slug=comedy') == {'Крутой Поворот'}
+        assert found(client, '?genre_slug=comedy,drama') == {
+            'Крутой Поворот', 'Проект'
+        }, 'Проверьте, что `genre_slug` принимает список слагов через запятую'
+        assert found(client, '?genre_slug=dram') == set(), (
+            'Проверьте, что `genre_slug` сравнивает слаги целиком'
+        )
+        assert found(client, '?category_slug=films,books&genre_slug=drama') == {
+            'Крутой Поворот', 'Проект'
+        }
+        response = client.get('/api/v1/titles/?genre_slug=drama,comedy')
+        assert response.json()['count'] == 2, (
+            'Проверьте, что фильтр по нескольким жанрам не дублирует произведения'
+        )
+        Genre.objects.filter(slug='comedy').delete()
+        Genre.objects.create(name='Ужасы', slug='comedy')
+        assert found(client, '?genre_slug=comedy') == set(), (
+            'Проверьте, что кэш слагов сбрасывается при изменении жанров'
+        )
@@ -0,0 +1,121 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_reviews, create_titles
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), len(context.captured_queries)
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 300
+
+
+class Test16ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_anonymous_reads_are_cached(self, admin_client, client):
+        create_titles(admin_client)
+        first, _ = get(client, '/api/v1/titles/?year=2000&page=1')
+        second, queries = get(client, '/api/v1/titles/?page=1&year=2000')
+        assert queries == 0, (
+            'Проверьте, что повторный анонимный GET запрос с теми же '
+            'параметрами в другом порядке отдаётся из кэша'
+        )
+        assert first == second
+        _, queries = get(client, '/api/v1/titles/?year=2020')
+        assert queries > 0, (
+            'Проверьте, что ответы с разными параметрами кэшируются отдельно'
+        )
+        get(admin_client, '/api/v1/genres/')
+        _, queries = get(admin_client, '/api/v1/genres/')
+        assert queries > 0, (
+            'Проверьте, что ответы авторизованным пользователям не кэшируются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_writes_invalidate_cache(self, admin_client, admin, client):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        assert get(client, title_url)[0]['rating'] == 4
+        assert get(client, reviews_url)[0]['count'] == 3
+
+        admin_client.delete(f'{reviews_url}{reviews[0]["id"]}/')
+        assert get(client, title_url)[0]['rating'] == 3, (
+            'Проверьте, что удаление отзыва сбрасывает кэш произведения'
+        )
+        assert get(client, reviews_url)[0]['count'] == 2, (
+            'Проверьте, что удаление отзыва сбрасывает кэш списка отзывов'
+        )
+
+        get(client, '/api/v1/titles/')
+        admin_client.patch(title_url, data={'category': 'books'})
+        titles_data, _ = get(client, '/api/v1/titles/')
+        category = {
+            title['id']: title['category']['slug']
+            for title in titles_data['results']
+        }[titles[0]['id']]
+        assert category == 'books', (
+            'Проверьте, что изменение произведения сбрасывает кэш списка'
+        )
+
+        get(client, '/api/v1/categories/')
+        admin_client.delete('/api/v1/categories/films/')
+        categories, _ = get(client, '/api/v1/categories/')
+        assert categories['count'] == 1, (
+            'Проверьте, что удаление категории сбрасывает кэш категорий'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_updates_invalidate_cache(self, admin_client, admin,
+                                              client, django_user_model):
+        from reviews.models import Review, Title
+
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        get(client, title_url)
+        author = django_user_model.objects.create_user(
+            username='bulk', email='bulk@yamdb.fake'
+        )
+        Review.objects.bulk_create([Review(
+            title_id=titles[0]['id'], author=author, text='текст', score=10
+        )])
+        Title.objects.update_ratings()
+        assert get(client, title_url)[0]['rating'] == 5, (
+            'Проверьте, что пересчёт рейтингов сбрасывает кэш произведений'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_only_username_changes_reset_authored(self,
+                                                     django_user_model):
+        from reviews import generations
+
+        def authored():
+            return generations.get_generations(
+                [generations.REVIEWS, generations.COMMENTS]
+            )
+
+        before = authored()
+        user = django_user_model.objects.create_user(
+            username='author', email='author@yamdb.fake'
+        )
+        user.bio = 'Биография'
+        user.save()
+        assert authored() == before, (
+            'Проверьте, что создание пользователя и изменение полей, '
+            'которых нет в ответах, не сбрасывают кэш отзывов и комментариев'
+        )
+        user.username = 'renamed'
+        user.save()
+        changed = authored()
+        assert all(new != old for new, old in zip(changed, before)), (
+            'Проверьте, что смена имени пользователя сбрасывает кэш '
+            'отзывов и комментариев'
+        )
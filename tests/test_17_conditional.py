@@ -0,0 +1,114 @@
+from unittest import mock
+
+import pytest
+
+from .common import auth_client, create_reviews, create_titles
+
+
+def revalidate(client, url, etag):
+    return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+
+class Test17ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_not_modified_before_serializer(self, admin_client, client):
+        from api.serializers import SafeTitleSerializer
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        for user_client in (admin_client, client):
+            response = user_client.get(url)
+            assert response.has_header('ETag') and response.has_header(
+                'Last-Modified'
+            ), (
+                'Проверьте, что ответ на GET запрос произведения содержит '
+                'заголовки `ETag` и `Last-Modified`'
+            )
+            with mock.patch.object(
+                SafeTitleSerializer, 'to_representation',
+                side_effect=AssertionError
+            ):
+                not_modified = user_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                assert not_modified.status_code == 304, (
+                    'Проверьте, что на запрос с актуальным `If-None-Match` '
+                    'возвращается статус 304 без сериализации'
+                )
+                assert user_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                ).status_code == 304
+            assert not_modified['ETag'] == response['ETag']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_validators_follow_writes(self, admin_client, admin, client):
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        urls = (title_url, reviews_url, '/api/v1/titles/')
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        auth_client(user).patch(
+            f'{reviews_url}{reviews[1]["id"]}/', data={'score': 10}
+        )
+        for url in urls:
+            assert revalidate(client, url, etags[url]) == 200, (
+                f'Проверьте, что изменение отзыва меняет `ETag` ответа `{url}`'
+            )
+
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        admin_client.delete('/api/v1/genres/comedy/')
+        assert revalidate(client, title_url, etags[title_url]) == 200, (
+            'Проверьте, что удаление жанра меняет `ETag` произведения'
+        )
+        assert revalidate(client, reviews_url, etags[reviews_url]) == 304
+
+        etag = client.get('/api/v1/categories/')['ETag']
+        admin_client.delete('/api/v1/categories/books/')
+        assert revalidate(client, '/api/v1/categories/', etag) == 200, (
+            'Проверьте, что удаление категории меняет `ETag` списка категорий'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_pages_have_own_validators(self, admin_client, client):
+        create_titles(admin_client)
+        first = client.get('/api/v1/titles/')['ETag']
+        filtered = client.get('/api/v1/titles/?year=2020')['ETag']
+        assert first != filtered, (
+            'Проверьте, что `ETag` списка зависит от фильтров'
+        )
+        assert revalidate(client, '/api/v1/titles/', first) == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_validators_follow_parents(self, admin_client, admin, client):
+        from .common import create_comments
+
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        review_url = f'{reviews_url}{reviews[0]["id"]}/'
+        comments_url = f'{review_url}comments/'
+        etags = {url: client.get(url)['ETag']
+                 for url in (reviews_url, review_url, comments_url)}
+        admin_client.patch(title_url, data={'name': 'Переименован'})
+        assert revalidate(client, reviews_url, etags[reviews_url]) == 200, (
+            'Проверьте, что переименование произведения меняет `ETag` '
+            'списка его отзывов'
+        )
+        assert revalidate(client, review_url, etags[review_url]) == 200
+        assert revalidate(client, comments_url, etags[comments_url]) == 304
+
+        etag = client.get(comments_url)['ETag']
+        admin_client.patch(review_url, data={'score': 9})
+        assert revalidate(client, comments_url, etag) == 304, (
+            'Проверьте, что изменение оценки отзыва не меняет `ETag` '
+            'комментариев'
+        )
+        admin_client.patch(review_url, data={'text': 'новый текст'})
+        assert revalidate(client, comments_url, etag) == 200, (
+            'Проверьте, что изменение текста отзыва меняет `ETag` '
+            'списка комментариев к нему'
+        )
+        assert client.get(comments_url).json()['results'][0]['review'] == (
+            'новый текст'
+        )
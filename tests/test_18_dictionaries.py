@@ -0,0 +1,180 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+DICTIONARY_QUERY = re.compile(r'FROM "reviews_(category|genre)"')
+
+
+def dictionary_queries(request):
+    with CaptureQueriesContext(connection) as context:
+        response = request()
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if DICTIONARY_QUERY.search(query['sql'])
+    ]
+
+
+class Test18DictionaryCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reads_and_writes_use_cache(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.get('/api/v1/titles/')
+        response, queries = dictionary_queries(
+            lambda: admin_client.get('/api/v1/titles/')
+        )
+        assert response.json()['results'][0]['genre'] == [
+            {'name': 'Комедия', 'slug': 'comedy'},
+            {'name': 'Ужасы', 'slug': 'horror'},
+        ]
+        assert queries == [], (
+            'Проверьте, что категории и жанры списка произведений '
+            'берутся из кэша справочников'
+        )
+        data = {
+            'name': 'Новый', 'year': 2001, 'genre': ['drama', 'comedy'],
+            'category': 'books'
+        }
+        response, queries = dictionary_queries(
+            lambda: admin_client.post('/api/v1/titles/', data=data)
+        )
+        assert response.status_code == 201
+        assert [query for query in queries if 'WHERE' in query and (
+            '"slug" =' in query or '"slug" IN' in query
+        )] == [], 'Проверьте, что слаги проверяются по кэшу справочников'
+        data['name'], data['genre'] = 'Другой', ['unknown']
+        assert admin_client.post(
+            '/api/v1/titles/', data=data
+        ).status_code == 400, (
+            'Проверьте, что несуществующий слаг жанра не проходит проверку'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_generation_invalidates_other_processes(self, admin_client):
+        from reviews import generations
+        from reviews.models import Genre
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[1]["id"]}/'
+        admin_client.get(url)
+        # Запись другого процесса: без сигналов в этом процессе.
+        Genre.objects.filter(slug='drama').update(name='Драмы')
+        generations.bump(generations.GENRES)
+        assert admin_client.get(url).json()['genre'] == [
+            {'name': 'Драмы', 'slug': 'drama'}
+        ], (
+            'Проверьте, что кэш справочников перечитывается при смене '
+            'общего поколения'
+        )
+
+        admin_client.post('/api/v1/genres/', data={
+            'name': 'Фэнтези', 'slug': 'fantasy'
+        })
+        response = admin_client.patch(url, data={'genre': ['fantasy']})
+        assert response.status_code == 200, (
+            'Проверьте, что новый жанр сразу проходит проверку слага'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_copies_expire_without_shared_generations(
+            self, admin_client, settings, monkeypatch):
+        from reviews import dictionaries
+        from reviews.models import Genre
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[1]["id"]}/'
+        admin_client.get(url)
+        # Запись другого процесса, чьё поколение сюда не дошло.
+        Genre.objects.filter(slug='drama').update(name='Драмы')
+        assert admin_client.get(url).json()['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'}
+        ]
+        loaded = dictionaries.monotonic()
+        monkeypatch.setattr(
+            dictionaries, 'monotonic',
+            lambda: loaded + settings.DICTIONARY_MAX_AGE + 1
+        )
+        assert admin_client.get(url).json()['genre'] == [
+            {'name': 'Драмы', 'slug': 'drama'}
+        ], (
+            'Проверьте, что копия справочника перечитывается по истечении '
+            '`DICTIONARY_MAX_AGE` при неизменном поколении'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_stale_copies_fall_back_to_database(
+            self, admin_client, settings, monkeypatch):
+        from django.utils import timezone
+        from reviews import dictionaries
+        from reviews.models import Category, Title
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        admin_client.get(url)
+        # Записи другого процесса: без сигналов в этом процессе.
+        Category.objects.bulk_create([Category(name='Музыка', slug='music')])
+        category = Category.objects.get(slug='music')
+        title = Title.objects.create(
+            name='Новый', year=2000, category_id=category.pk
+        )
+        data = admin_client.get(f'/api/v1/titles/{title.pk}/').json()
+        assert data['category'] == {'name': 'Музыка', 'slug': 'music'}, (
+            'Проверьте, что категория, которой нет в копии справочника, '
+            'читается из БД'
+        )
+
+        stale = admin_client.get(url)
+        Category.objects.filter(slug=stale.json()['category']['slug']).update(
+            name='Другое', modified=timezone.now()
+        )
+        loaded = dictionaries.monotonic()
+        monkeypatch.setattr(
+            dictionaries, 'monotonic',
+            lambda: loaded + settings.DICTIONARY_MAX_AGE + 1
+        )
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=stale['ETag'])
+        assert response.status_code == 200, (
+            'Проверьте, что ETag произведения меняется при обновлении '
+            'копии справочника'
+        )
+        assert response.json()['category']['name'] == 'Другое'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_deleted_slugs_fail_validation(self, admin_client):
+        from reviews.models import Category, Genre
+
+        create_titles(admin_client)
+        Category.objects.create(name='Музыка', slug='music')
+        Genre.objects.create(name='Джаз', slug='jazz')
+        admin_client.get('/api/v1/titles/')
+        # Удаление другим процессом: копии этого процесса не сбрасываются.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM reviews_categorystats WHERE category_id IN "
+                "(SELECT id FROM reviews_category WHERE slug = 'music')"
+            )
+            cursor.execute("DELETE FROM reviews_category WHERE slug = 'music'")
+            cursor.execute(
+                "DELETE FROM reviews_genrestats WHERE genre_id IN "
+                "(SELECT id FROM reviews_genre WHERE slug = 'jazz')"
+            )
+            cursor.execute("DELETE FROM reviews_genre WHERE slug = 'jazz'")
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Новый', 'year': 2001, 'genre': ['jazz'],
+            'category': 'music'
+        })
+        assert response.status_code == 400, (
+            'Проверьте, что слаг, удалённый другим процессом, не проходит '
+            'проверку'
+        )
+        assert set(response.json()) == {'category'}
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Новый', 'year': 2001, 'genre': ['jazz'],
+            'category': 'films'
+        })
+        assert response.status_code == 400
+        assert set(response.json()) == {'genre'}
@@ -0,0 +1,107 @@
+import pytest
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .common import create_titles
+
+
+def token_client(client, user):
+    response = client.post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    token_client = APIClient()
+    token_client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}'
+    )
+    return token_client
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+class Test19StatelessAuth:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_requests_without_user_queries(self, client, admin_client,
+                                              django_user_model):
+        titles, _, _ = create_titles(admin_client)
+        user = django_user_model.objects.create_user(
+            username='reader', email='reader@yamdb.fake', role='moderator'
+        )
+        reader = token_client(client, user)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        reader.get(url)
+        response, queries = user_queries(reader, url)
+        assert response.status_code == 200
+        assert queries == [], (
+            'Проверьте, что аутентификация по выданному токену не читает '
+            'пользователя из БД на каждый запрос'
+        )
+        response = reader.post(url, data={'text': 'текст', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == 'reader'
+        review_url = f'{url}{response.json()["id"]}/'
+        assert reader.patch(review_url, data={'score': 8}).status_code == 200
+        response = reader.get('/api/v1/users/me/')
+        assert response.json()['email'] == 'reader@yamdb.fake', (
+            'Проверьте, что `users/me` возвращает профиль из БД'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_revokes_token(self, client, admin_client,
+                                          django_user_model):
+        user = django_user_model.objects.create_user(
+            username='staff', email='staff@yamdb.fake', role='admin'
+        )
+        staff = token_client(client, user)
+        response = staff.post(
+            '/api/v1/categories/', data={'name': 'Фильм', 'slug': 'films'}
+        )
+        assert response.status_code == 201, (
+            'Проверьте, что роль из токена даёт права администратора'
+        )
+        admin_client.patch('/api/v1/users/staff/', data={'role': 'user'})
+        response = staff.post(
+            '/api/v1/categories/', data={'name': 'Книга', 'slug': 'books'}
+        )
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли выданный ранее токен отклоняется'
+        )
+        staff = token_client(client, django_user_model.objects.get(pk=user.pk))
+        response = staff.post(
+            '/api/v1/categories/', data={'name': 'Книга', 'slug': 'books'}
+        )
+        assert response.status_code == 403
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_expired_states_are_pruned(self, django_user_model,
+                                          settings, monkeypatch):
+        from api import authentication
+
+        users = [
+            django_user_model.objects.create_user(
+                username=f'user{i}', email=f'user{i}@yamdb.fake'
+            )
+            for i in range(3)
+        ]
+        now = [0]
+        monkeypatch.setattr(authentication.time, 'monotonic', lambda: now[0])
+        states = authentication.UserStates()
+        for user in users[:2]:
+            states.get(user.pk)
+        now[0] = settings.AUTH_STATE_TTL + 1
+        states.get(users[2].pk)
+        assert list(states.states) == [users[2].pk], (
+            'Проверьте, что устаревшие состояния пользователей удаляются '
+            'из памяти процесса'
+        )
@@ -0,0 +1,99 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+
+def signup(client, username):
+    response = client.post('/api/v1/auth/signup/', data={
+        'username': username, 'email': f'{username}@yamdb.fake'
+    })
+    assert response.status_code == 200
+
+
+def queue_depth():
+    out = StringIO()
+    call_command('sendmail', status=True, stdout=out)
+    return json.loads(out.getvalue())
+
+
+@pytest.fixture(autouse=True)
+def enable_outbox(settings):
+    settings.EMAIL_OUTBOX = True
+
+
+class Test20Outbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_enqueues_email(self, client):
+        from reviews.models import OutgoingEmail
+
+        outbox_before = len(mail.outbox)
+        signup(client, 'first')
+        signup(client, 'second')
+        assert len(mail.outbox) == outbox_before, (
+            'Проверьте, что при EMAIL_OUTBOX письмо не отправляется в запросе'
+        )
+        assert OutgoingEmail.objects.count() == 2
+        assert queue_depth() == {'pending': 2, 'due': 2, 'failed': 0}
+
+        call_command('sendmail', once=True, batch_size=1, stdout=StringIO())
+        assert sorted(
+            message.to[0] for message in mail.outbox[outbox_before:]
+        ) == ['first@yamdb.fake', 'second@yamdb.fake'], (
+            'Проверьте, что команда `sendmail` отправляет письма из очереди'
+        )
+        assert not OutgoingEmail.objects.exists(), (
+            'Проверьте, что отправленные письма удаляются из очереди'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_failed_emails_back_off(self, client):
+        from reviews.models import OutgoingEmail
+
+        signup(client, 'retry')
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('smtp is down')
+        ):
+            call_command('sendmail', once=True, stdout=StringIO())
+        email = OutgoingEmail.objects.get()
+        assert email.attempts == 1 and 'smtp is down' in email.last_error
+        assert email.next_attempt > timezone.now(), (
+            'Проверьте, что неудачная отправка откладывает письмо'
+        )
+        assert queue_depth() == {'pending': 1, 'due': 0, 'failed': 0}
+
+        outbox_before = len(mail.outbox)
+        call_command('sendmail', once=True, stdout=StringIO())
+        assert len(mail.outbox) == outbox_before, (
+            'Проверьте, что отложенное письмо не отправляется до срока'
+        )
+        OutgoingEmail.objects.update(
+            next_attempt=timezone.now() - timedelta(seconds=1)
+        )
+        call_command('sendmail', once=True, stdout=StringIO())
+        assert len(mail.outbox) == outbox_before + 1
+        assert not OutgoingEmail.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_attempts_are_limited(self, client, settings):
+        from reviews.models import OutgoingEmail
+
+        settings.EMAIL_OUTBOX_BACKOFF = 0
+        signup(client, 'broken')
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('smtp is down')
+        ):
+            for _ in range(settings.EMAIL_OUTBOX_MAX_ATTEMPTS + 1):
+                call_command('sendmail', once=True, stdout=StringIO())
+        assert OutgoingEmail.objects.get().attempts == (
+            settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        ), 'Проверьте, что число попыток отправки ограничено'
+        assert queue_depth() == {'pending': 0, 'due': 0, 'failed': 1}
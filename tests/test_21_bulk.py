@@ -0,0 +1,118 @@
+import pytest
+from rest_framework.test import APIClient
+
+from .common import create_reviews, create_titles
+
+
+class Test21Bulk:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_reviews(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        data = [
+            {'title': titles[0]['id'], 'text': 'первый', 'score': 4},
+            {'title': titles[1]['id'], 'text': 'второй', 'score': 9},
+        ]
+        response = user_client.post(
+            '/api/v1/reviews/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 201, (
+            'Проверьте, что пакетный POST запрос к `/api/v1/reviews/bulk/` '
+            'возвращает статус 201'
+        )
+        created = response.json()
+        assert [review['text'] for review in created] == ['первый', 'второй']
+        assert [review['title'] for review in created] == [
+            titles[0]['name'], titles[1]['name']
+        ]
+        for title, review in zip(titles, created):
+            url = f'/api/v1/titles/{title["id"]}/reviews/{review["id"]}/'
+            assert user_client.get(url).json()['text'] == review['text'], (
+                'Проверьте, что в ответе возвращаются id созданных отзывов'
+            )
+        rating = user_client.get(
+            f'/api/v1/titles/{titles[1]["id"]}/'
+        ).json()['rating']
+        assert rating == 9, (
+            'Проверьте, что пакетное создание отзывов пересчитывает рейтинг'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_reviews_errors(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        user_client.post(
+            f'/api/v1/titles/{title_id}/reviews/',
+            data={'text': 'уже есть', 'score': 5}
+        )
+        data = [
+            {'title': titles[1]['id'], 'text': 'новый', 'score': 5},
+            {'title': title_id, 'text': 'повтор', 'score': 5},
+            {'title': 100500, 'text': 'нет тайтла', 'score': 5},
+        ]
+        response = user_client.post(
+            '/api/v1/reviews/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 400
+        errors = response.json()
+        assert len(errors) == 3 and errors[0] == {}, (
+            'Проверьте, что ошибки возвращаются для каждого элемента пакета'
+        )
+        assert errors[1] and errors[2]
+        response = user_client.get(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert response.json()['rating'] is None, (
+            'Проверьте, что пакет с ошибками не создаёт ни одного отзыва'
+        )
+
+        data = [{'title': titles[1]['id'], 'text': 'дубль', 'score': 5}] * 2
+        response = user_client.post(
+            '/api/v1/reviews/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что два отзыва на одно произведение в пакете '
+            'отклоняются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_limit(self, user_client, settings):
+        settings.BULK_MAX_ITEMS = 1
+        data = [{'text': 'текст'}] * 2
+        response = user_client.post(
+            '/api/v1/comments/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 400, (
+            'Проверьте, что размер пакета ограничен `BULK_MAX_ITEMS`'
+        )
+        response = APIClient().post(
+            '/api/v1/comments/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 401
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_comments(self, admin_client, admin, user_client):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        data = [
+            {'review': reviews[0]['id'], 'text': 'раз'},
+            {'review': reviews[1]['id'], 'text': 'два'},
+            {'review': reviews[0]['id'], 'text': 'три'},
+        ]
+        response = user_client.post(
+            '/api/v1/comments/bulk/', data=data, format='json'
+        )
+        assert response.status_code == 201
+        created = response.json()
+        assert [comment['text'] for comment in created] == [
+            'раз', 'два', 'три'
+        ]
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+            f'comments/{created[2]["id"]}/'
+        )
+        assert user_client.get(url).json()['text'] == 'три', (
+            'Проверьте, что в ответе возвращаются id созданных комментариев'
+        )
+        response = user_client.post(
+            '/api/v1/comments/bulk/',
+            data=[{'review': 100500, 'text': 'нет отзыва'}], format='json'
+        )
+        assert response.status_code == 400
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+from django.db import OperationalError, connection
+from rest_framework.test import APIClient
+
+WRITERS = 8
+
+
+def rating_state(title):
+    title.refresh_from_db()
+    return title.reviews_count, title.scores_sum, title.rating
+
+
+def write_reviews(token, url, shared_url, score, barrier, failures,
+                  statuses):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    try:
+        barrier.wait()
+        statuses.append((
+            'post', client.post(url, data={'text': 'т', 'score': score})
+        ))
+        # Модераторы одновременно меняют и удаляют один общий отзыв.
+        statuses.append((
+            'patch', client.patch(shared_url, data={'score': score})
+        ))
+        if score % 2:
+            statuses.append(('delete', client.delete(shared_url)))
+    except OperationalError as error:
+        # «database is locked»: SQLite не дождался блокировки записи или
+        # обнаружил взаимную блокировку транзакций.
+        failures.append(error)
+    finally:
+        connection.close()
+
+
+class Test22Concurrency:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_parallel_review_writes(self, django_user_model):
+        from api.authentication import access_token_for
+        from reviews.models import Category, Review, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Тайтл', year=2000,
+                                     category=category)
+        tokens = [
+            str(access_token_for(django_user_model.objects.create_user(
+                username=f'writer{i}', email=f'writer{i}@yamdb.fake',
+                role='moderator'
+            )))
+            for i in range(WRITERS)
+        ]
+        shared = Review.objects.create(
+            title=title, text='т', score=5,
+            author=django_user_model.objects.create_user(
+                username='shared', email='shared@yamdb.fake'
+            )
+        )
+        title.add_score(shared.score)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        shared_url = f'{url}{shared.id}/'
+        barrier = threading.Barrier(WRITERS)
+        failures = []
+        statuses = []
+        threads = [
+            threading.Thread(
+                target=write_reviews,
+                args=(token, url, shared_url, score, barrier, failures,
+                      statuses)
+            )
+            for score, token in enumerate(tokens, start=1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not failures, (
+            'Проверьте, что параллельная запись отзывов не приводит к '
+            'взаимной блокировке транзакций'
+        )
+        codes = {'post': [], 'patch': [], 'delete': []}
+        for method, response in statuses:
+            codes[method].append(response.status_code)
+        assert codes['post'] == [201] * WRITERS, (
+            'Проверьте, что параллельные отзывы разных авторов создаются'
+        )
+        # Общий отзыв удаляет первый из удаляющих, после этого изменения
+        # и повторные удаления получают 404. Каждый удаляющий сначала
+        # меняет отзыв, поэтому хотя бы одно изменение успевает раньше.
+        assert set(codes['patch']) <= {200, 404} and 200 in codes['patch']
+        assert sorted(codes['delete']) == [204] + [404] * (WRITERS // 2 - 1), (
+            'Проверьте, что общий отзыв удаляется ровно один раз'
+        )
+
+        stored = rating_state(title)
+        Title.objects.filter(pk=title.pk).update_ratings()
+        assert stored == rating_state(title), (
+            'Проверьте, что после параллельной записи отзывов рейтинг '
+            'произведения совпадает с оценками его отзывов'
+        )
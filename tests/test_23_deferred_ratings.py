@@ -0,0 +1,113 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import auth_client, create_reviews
+
+
+def backlog():
+    out = StringIO()
+    call_command('refreshratings', status=True, stdout=out)
+    return json.loads(out.getvalue())['dirty']
+
+
+def rating(client, title_id):
+    return client.get(f'/api/v1/titles/{title_id}/').json()['rating']
+
+
+@pytest.fixture(autouse=True)
+def defer_ratings(settings):
+    settings.DEFERRED_RATINGS = True
+
+
+class Test23DeferredRatings:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_mark_titles(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        assert rating(admin_client, title_id) is None, (
+            'Проверьте, что при DEFERRED_RATINGS запись отзыва не '
+            'пересчитывает рейтинг'
+        )
+        assert backlog() == 1, (
+            'Проверьте, что отзывы к одному произведению отмечают его '
+            'для пересчёта один раз'
+        )
+        call_command('refreshratings', once=True, stdout=StringIO())
+        assert rating(admin_client, title_id) == 4, (
+            'Проверьте, что команда `refreshratings` пересчитывает рейтинг '
+            'отмеченных произведений'
+        )
+        assert backlog() == 0
+        stats = admin_client.get('/api/v1/categories/films/stats/').json()
+        assert stats['reviews_count'] == 3, (
+            'Проверьте, что пересчёт рейтингов обновляет статистику категорий'
+        )
+
+        admin_client.delete(
+            f'/api/v1/titles/{title_id}/reviews/{reviews[1]["id"]}/'
+        )
+        assert backlog() == 1
+        call_command(
+            'refreshratings', once=True, batch_size=1, stdout=StringIO()
+        )
+        assert rating(admin_client, title_id) == 4
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_writes_between_passes_cost_one_recompute(
+            self, django_user_model, monkeypatch):
+        from reviews import ratings
+        from reviews.management.commands import refreshratings
+        from reviews.models import Category, Title
+
+        category = Category.objects.create(name='Фильм', slug='films')
+        title = Title.objects.create(name='Тайтл', year=2000,
+                                     category=category)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+
+        def write_reviews(prefix):
+            for score in range(1, 6):
+                author = django_user_model.objects.create_user(
+                    username=f'{prefix}{score}',
+                    email=f'{prefix}{score}@yamdb.fake'
+                )
+                auth_client(author).post(
+                    url, data={'text': 'т', 'score': score}
+                )
+
+        recomputed = []
+        reconcile = ratings.reconcile
+
+        def record(title_ids):
+            recomputed.append(list(title_ids))
+            reconcile(title_ids)
+
+        class Stop(Exception):
+            pass
+
+        passes = []
+
+        def sleep(seconds):
+            passes.append(seconds)
+            if len(passes) == 2:
+                raise Stop
+            write_reviews('second')
+
+        monkeypatch.setattr(ratings, 'reconcile', record)
+        monkeypatch.setattr(refreshratings.time, 'sleep', sleep)
+        write_reviews('first')
+        with pytest.raises(Stop):
+            call_command('refreshratings', interval=7, stdout=StringIO())
+        assert passes == [7, 7], (
+            'Проверьте, что `refreshratings` ждёт интервал после каждого '
+            'прохода, даже если есть отмеченные произведения'
+        )
+        assert recomputed == [[title.id], [title.id]], (
+            'Проверьте, что отзывы к произведению между проходами '
+            'пересчитываются одним запросом'
+        )
+        title.refresh_from_db()
+        assert (title.reviews_count, title.scores_sum) == (10, 30)
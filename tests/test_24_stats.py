@@ -0,0 +1,58 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_reviews
+
+
+def stats(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET запрос `{url}` возвращает статус 200'
+    )
+    data = response.json()
+    return data['titles_count'], data['reviews_count'], data['average_score']
+
+
+class Test24Stats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_stats_follow_writes(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        assert stats(client, '/api/v1/categories/films/stats/') == (1, 3, 4.0)
+        assert stats(client, '/api/v1/genres/horror/stats/') == (1, 3, 4.0)
+        assert stats(client, '/api/v1/genres/drama/stats/') == (1, 0, None)
+        assert client.get('/api/v1/genres/unknown/stats/').status_code == 404
+
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        admin_client.delete(f'{title_url}reviews/{reviews[1]["id"]}/')
+        assert stats(client, '/api/v1/categories/films/stats/') == (1, 2, 4.5), (
+            'Проверьте, что удаление отзыва обновляет статистику категории'
+        )
+        admin_client.patch(title_url, data={'category': 'books'})
+        assert stats(client, '/api/v1/categories/films/stats/') == (0, 0, None)
+        assert stats(client, '/api/v1/categories/books/stats/') == (2, 2, 4.5), (
+            'Проверьте, что перенос произведения в другую категорию '
+            'переносит его статистику'
+        )
+        admin_client.patch(title_url, data={'genre': ['drama']})
+        assert stats(client, '/api/v1/genres/horror/stats/') == (0, 0, None)
+        assert stats(client, '/api/v1/genres/drama/stats/') == (2, 2, 4.5)
+        admin_client.delete(title_url)
+        assert stats(client, '/api/v1/genres/drama/stats/') == (1, 0, None), (
+            'Проверьте, что удаление произведения обновляет статистику жанров'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_command(self, client, admin_client, admin):
+        from reviews.models import CategoryStats, GenreStats
+
+        create_reviews(admin_client, admin)
+        CategoryStats.objects.all().delete()
+        GenreStats.objects.update(titles_count=0, reviews_count=0)
+        call_command('rebuildstats', stdout=StringIO())
+        assert stats(client, '/api/v1/categories/films/stats/') == (1, 3, 4.0)
+        assert stats(client, '/api/v1/genres/comedy/stats/') == (1, 3, 4.0), (
+            'Проверьте, что команда `rebuildstats` пересчитывает статистику'
+        )
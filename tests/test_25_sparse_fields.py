@@ -0,0 +1,72 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments
+
+
+def get(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET запрос `{url}` возвращает статус 200'
+    )
+    return response.json(), [
+        query['sql'] for query in context.captured_queries
+    ]
+
+
+class Test25SparseFields:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_title_fields(self, admin_client, admin):
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        data, queries = get(admin_client, '/api/v1/titles/?fields=id,rating')
+        assert [set(title) for title in data['results']] == [
+            {'id', 'rating'}, {'id', 'rating'}
+        ], 'Проверьте, что параметр `fields` оставляет в ответе только эти поля'
+        assert not [sql for sql in queries if 'description' in sql], (
+            'Проверьте, что невыбранные поля не читаются из БД'
+        )
+        assert not [sql for sql in queries if 'reviews_title_genre' in sql], (
+            'Проверьте, что без поля `genre` связи с жанрами не читаются'
+        )
+
+        url = f'/api/v1/titles/{titles[0]["id"]}/?omit=description,genre'
+        data, _ = get(admin_client, url)
+        assert set(data) == {'id', 'name', 'year', 'rating', 'category'}, (
+            'Проверьте, что параметр `omit` убирает поля из ответа'
+        )
+        assert data['category']['slug'] == titles[0]['category']
+
+        response = admin_client.get('/api/v1/titles/?fields=id,unknown')
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное поле в `fields` даёт статус 400'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_review_and_comment_fields(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        full, full_queries = get(admin_client, url)
+        data, queries = get(admin_client, f'{url}?fields=id,score')
+        assert [set(review) for review in data['results']] == [
+            {'id', 'score'}
+        ] * len(reviews)
+        assert len(queries) == len(full_queries)
+        assert not [sql for sql in queries if 'JOIN "reviews_user"' in sql], (
+            'Проверьте, что без поля `author` авторы отзывов не читаются'
+        )
+
+        url = f'{url}{reviews[0]["id"]}/comments/'
+        data, queries = get(admin_client, f'{url}?omit=review,pub_date')
+        assert [comment['text'] for comment in data['results']] == [
+            comment['text'] for comment in comments
+        ]
+        assert set(data['results'][0]) == {'id', 'text', 'author'}
+        data, _ = get(admin_client, f'{url}?fields=author&cursor=')
+        assert [set(comment) for comment in data['results']] == [
+            {'author'}
+        ] * len(comments), (
+            'Проверьте, что выбор полей работает с keyset пагинацией'
+        )